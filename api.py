@@ -0,0 +1,385 @@
+# api.py
+"""Async HTTP API for the matcher, served next to the Streamlit UI.
+
+Runs on the LLM client's own event loop, so requests share its connection pool,
+rate limiters and single-flight registry with no cross-loop hops, and uses the
+same analysis cache, corpus store and job queue files as the UI.
+
+    python api.py --port 8000
+
+    POST /v1/extract        PDF upload (raw application/pdf or multipart "file") -> text
+    POST /v1/ingest         zip archive of resumes (raw application/zip or multipart "file")
+                            -> NDJSON {name, pages, text | error} per document, then {"stats"}
+    POST /v1/match          JSON or multipart (job_description + resume_text | "resume" PDF);
+                            ?stream=true for server-sent "field" / "done" events
+    POST /v1/batch          {"resumes": {...}, "jds": {...}, "top_k": 5} -> NDJSON records as they finish
+    POST /v1/jobs           queue a match in the background -> 202 {"job_id"}
+    GET  /v1/jobs/{job_id}  job status, streamed fields so far and the result
+    GET  /metrics           Prometheus text
+    GET  /healthz
+"""
+import os
+import sys
+import json
+import math
+import asyncio
+import zipfile
+import tempfile
+import argparse
+
+import uvicorn
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from engine import (
+    MODEL_OPTIONS, ANALYSIS_DEPTHS, AUTO_MODEL, DEFAULT_MODEL, DEFAULT_DEPTH, DEFAULT_TEMPERATURE,
+    AnalysisParseError, aanalyze, amatch_batch, astream_analysis, get_client
+)
+from ingest import SPOOL_MEMORY_BYTES, Ingestor
+from job_queue import JobQueue
+from corpus_store import CorpusStore
+from metrics import get_metrics
+from pdf_extract import extract_pdf_text
+from result_cache import AnalysisCache
+
+# ------------------------------
+# Config
+# ------------------------------
+MAX_UPLOAD_BYTES = int(os.environ.get("API_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+MAX_ARCHIVE_BYTES = int(os.environ.get("API_MAX_ARCHIVE_BYTES", 500 * 1024 * 1024))
+MAX_BATCH_PAIRS = int(os.environ.get("API_MAX_BATCH_PAIRS", 500))
+MAX_BATCH_CONCURRENCY = int(os.environ.get("API_MAX_BATCH_CONCURRENCY", 16))
+TEMPERATURE_RANGE = (0.0, 2.0)  # what the Groq API accepts
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _flag(value) -> bool:
+    return value if isinstance(value, bool) else str(value or "").lower() in TRUE_VALUES
+
+
+def _sse(event, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def run_payload(run) -> dict:
+    """An AnalysisRun as JSON: the ResumeAnalysisResult plus how it was produced"""
+    return {
+        "result": run.result,
+        "cached": run.cached,
+        "coalesced": run.coalesced,
+        "reasked_fields": run.reasked_fields,
+        "defaulted_fields": run.defaulted_fields,
+        "routed_model": run.routed_model,
+        "elapsed": round(run.elapsed, 3),
+    }
+
+
+def model_params(data) -> dict:
+    """Validate the model / depth / temperature / execution mode options of a request"""
+    params = {
+        "model": data.get("model") or DEFAULT_MODEL,
+        "depth": data.get("depth") or DEFAULT_DEPTH,
+        "sectioned": _flag(data.get("sectioned")),
+        "jd_profile": _flag(data.get("jd_profile")),
+    }
+    if params["model"] not in MODEL_OPTIONS and params["model"] != AUTO_MODEL:
+        raise ApiError(400, f"model must be {AUTO_MODEL!r} or one of {MODEL_OPTIONS}")
+    if params["depth"] not in ANALYSIS_DEPTHS:
+        raise ApiError(400, f"depth must be one of {ANALYSIS_DEPTHS}")
+    try:
+        params["temperature"] = float(data.get("temperature", DEFAULT_TEMPERATURE))
+    except (TypeError, ValueError):
+        raise ApiError(400, "temperature must be a number")
+    low, high = TEMPERATURE_RANGE
+    # float() also parses "nan" / "inf", which would poison the cache key and the provider call
+    if not math.isfinite(params["temperature"]) or not low <= params["temperature"] <= high:
+        raise ApiError(400, f"temperature must be between {low} and {high}")
+    return params
+
+
+def positive_int_param(data, name, default=None):
+    """Optional positive int field of a request; `default` when absent"""
+    value = data.get(name)
+    if value in (None, "", 0):
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"{name} must be a positive integer")
+    if isinstance(value, bool) or number < 1 or (isinstance(value, float) and value != number):
+        raise ApiError(400, f"{name} must be a positive integer")
+    return number
+
+
+def documents_param(data, name) -> dict:
+    """A batch's `name` field ({id: text} or [text, ...]) as {id: text}; all texts non-empty strings"""
+    value = data.get(name)
+    if isinstance(value, dict):
+        documents = value
+    elif isinstance(value, list):
+        documents = dict(enumerate(value))
+    else:
+        raise ApiError(400, f"{name} must be a non-empty object of id -> text, or a list of texts")
+    if not documents or not all(isinstance(text, str) and text.strip() for text in documents.values()):
+        raise ApiError(400, f"{name} must be a non-empty object of id -> text, or a list of texts")
+    return documents
+
+
+def match_params(data) -> dict:
+    """Validate a match request body into `aanalyze` keyword arguments"""
+    params = {
+        "job_description": str(data.get("job_description") or "").strip(),
+        "resume_text": str(data.get("resume_text") or "").strip(),
+    }
+    if not params["job_description"] or not params["resume_text"]:
+        raise ApiError(400, "job_description and resume_text (or a resume PDF) are required")
+    return {**params, **model_params(data)}
+
+
+class MatcherAPI:
+    """Starlette app over the engine; must run on `client`'s event loop (see `serve`)"""
+
+    def __init__(self, client=None, cache=None, store=None, queue=None):
+        self.client = client or get_client()
+        self.cache = cache or AnalysisCache()
+        self.store = store or CorpusStore()
+        self.queue = queue or JobQueue(client=self.client, cache=self.cache, on_complete=self._store_job)
+        get_metrics().register("analysis_cache", self.cache.stats)
+        get_metrics().register("jobs", self.queue.stats)
+        self.app = Starlette(
+            routes=[
+                Route("/healthz", self.healthz),
+                Route("/metrics", self.metrics),
+                Route("/v1/extract", self.extract, methods=["POST"]),
+                Route("/v1/ingest", self.ingest, methods=["POST"]),
+                Route("/v1/match", self.match, methods=["POST"]),
+                Route("/v1/batch", self.batch, methods=["POST"]),
+                Route("/v1/jobs", self.submit_job, methods=["POST"]),
+                Route("/v1/jobs/{job_id}", self.job_status),
+            ],
+            exception_handlers={ApiError: self._api_error},
+        )
+
+    async def _api_error(self, request, exc):
+        return JSONResponse({"error": str(exc)}, status_code=exc.status)
+
+    # ------------------------------
+    # Inputs
+    # ------------------------------
+    async def _pdf_text(self, data) -> str:
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise ApiError(413, f"PDF larger than {MAX_UPLOAD_BYTES} bytes")
+        try:
+            text = await asyncio.to_thread(extract_pdf_text, data)
+        except Exception as e:
+            raise ApiError(400, f"could not read PDF: {e}")
+        if not text:
+            raise ApiError(422, "no text could be extracted from the PDF")
+        return text
+
+    async def _read_body(self, request) -> dict:
+        """JSON body, or multipart form fields with an optional "resume" PDF file"""
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form(max_part_size=MAX_UPLOAD_BYTES)
+            data = {key: value for key, value in form.items() if isinstance(value, str)}
+            upload = form.get("resume")
+            if upload is not None and not isinstance(upload, str):
+                data["resume_text"] = await self._pdf_text(await upload.read())
+            return data
+        try:
+            data = await request.json()
+        except ValueError:
+            raise ApiError(400, "expected a JSON body or a multipart form")
+        if not isinstance(data, dict):
+            raise ApiError(400, "expected a JSON object")
+        return data
+
+    async def _store(self, params, run):
+        await asyncio.to_thread(self.store.add_analysis, params["resume_text"], params["job_description"],
+                                run.result, model=run.routed_model or params["model"], depth=params["depth"])
+
+    def _store_job(self, params, run):
+        self.store.add_analysis(params["resume_text"], params["job_description"], run.result,
+                                model=run.routed_model or params["model"], depth=params["depth"], resume_name=params["resume_name"])
+
+    # ------------------------------
+    # Endpoints
+    # ------------------------------
+    async def healthz(self, request):
+        return JSONResponse({"status": "ok"})
+
+    async def metrics(self, request):
+        return PlainTextResponse(get_metrics().prometheus_text(), media_type="text/plain; version=0.0.4")
+
+    async def extract(self, request):
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form(max_part_size=MAX_UPLOAD_BYTES)
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise ApiError(400, 'multipart upload needs a "file" part')
+            data = await upload.read()
+        else:
+            data = await request.body()
+        text = await self._pdf_text(data)
+        return JSONResponse({"text": text, "characters": len(text)})
+
+    async def _spool_archive(self, request):
+        """The request's zip archive as a seekable temp file, without holding it in memory"""
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            # Starlette already spools file parts to disk
+            form = await request.form(max_part_size=MAX_UPLOAD_BYTES)
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise ApiError(400, 'multipart upload needs a "file" part')
+            if upload.size is not None and upload.size > MAX_ARCHIVE_BYTES:
+                raise ApiError(413, f"archive larger than {MAX_ARCHIVE_BYTES} bytes")
+            return upload.file
+        spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_ARCHIVE_BYTES:
+                spooled.close()
+                raise ApiError(413, f"archive larger than {MAX_ARCHIVE_BYTES} bytes")
+            await asyncio.to_thread(spooled.write, chunk)
+        spooled.seek(0)
+        return spooled
+
+    async def ingest(self, request):
+        archive = await self._spool_archive(request)
+        if not await asyncio.to_thread(zipfile.is_zipfile, archive):
+            archive.close()
+            raise ApiError(400, "expected a zip archive")
+        archive.seek(0)
+
+        async def documents():
+            ingestor = Ingestor()
+            entries = ingestor.iter_archive(archive)
+            try:
+                while True:
+                    try:
+                        doc = await asyncio.to_thread(next, entries, None)
+                    except Exception as e:
+                        yield json.dumps({"error": f"could not read archive: {e}"}) + "\n"
+                        break
+                    if doc is None:
+                        break
+                    record = {"name": doc.name, "pages": doc.pages, "bytes": doc.bytes}
+                    if doc.error:
+                        record["error"] = doc.error
+                    else:
+                        record["text"] = await asyncio.to_thread(doc.read_text)
+                    yield json.dumps(record, ensure_ascii=False) + "\n"
+                yield json.dumps({"stats": ingestor.stats.as_dict()}) + "\n"
+            finally:
+                entries.close()
+                archive.close()
+                ingestor.close()
+
+        return StreamingResponse(documents(), media_type="application/x-ndjson")
+
+    async def match(self, request):
+        params = match_params(await self._read_body(request))
+        if _flag(request.query_params.get("stream")):
+            return StreamingResponse(self._stream_match(params), media_type="text/event-stream",
+                                     headers={"Cache-Control": "no-cache"})
+        try:
+            run = await aanalyze(**params, client=self.client, cache=self.cache)
+        except AnalysisParseError as e:
+            return JSONResponse({"error": f"failed to parse AI response: {e}", "raw_output": e.raw_output},
+                                status_code=502)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=502)
+        await self._store(params, run)
+        return JSONResponse(run_payload(run))
+
+    async def _stream_match(self, params):
+        try:
+            async for event in astream_analysis(**params, client=self.client, cache=self.cache):
+                if event[0] == "done":
+                    await self._store(params, event[1])
+                    yield _sse("done", run_payload(event[1]))
+                else:
+                    yield _sse("field", {"name": event[1], "value": event[2]})
+        except AnalysisParseError as e:
+            yield _sse("error", {"error": f"failed to parse AI response: {e}", "raw_output": e.raw_output})
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+
+    async def batch(self, request):
+        data = await self._read_body(request)
+        params = model_params(data)
+        resume_texts, jd_texts = documents_param(data, "resumes"), documents_param(data, "jds")
+        top_k = positive_int_param(data, "top_k")
+        pairs = len(jd_texts) * min(top_k or len(resume_texts), len(resume_texts))
+        if pairs > MAX_BATCH_PAIRS:
+            raise ApiError(413, f"{pairs} pairs exceeds the limit of {MAX_BATCH_PAIRS}; use top_k or split the batch")
+        concurrency = min(positive_int_param(data, "concurrency", 8), MAX_BATCH_CONCURRENCY)
+        store = _flag(data.get("store", True))
+
+        async def records():
+            async for record in amatch_batch(resume_texts, jd_texts, **params, max_concurrency=concurrency,
+                                             client=self.client, cache=self.cache, top_k=top_k):
+                if store and "error" not in record:
+                    await asyncio.to_thread(self.store.add_analysis, resume_texts[record["resume_id"]],
+                                            jd_texts[record["jd_id"]], record["result"], model=record["model"],
+                                            depth=params["depth"], resume_name=str(record["resume_id"]),
+                                            jd_title=str(record["jd_id"]))
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(records(), media_type="application/x-ndjson")
+
+    async def submit_job(self, request):
+        data = await self._read_body(request)
+        params = match_params(data)
+        job_id = await asyncio.to_thread(self.queue.submit, **params, resume_name=data.get("resume_name"))
+        return JSONResponse({"job_id": job_id, "status_url": f"/v1/jobs/{job_id}"}, status_code=202)
+
+    async def job_status(self, request):
+        job = await asyncio.to_thread(self.queue.get, request.path_params["job_id"])
+        if job is None:
+            raise ApiError(404, "unknown or expired job")
+        return JSONResponse({
+            "job_id": job["id"],
+            "status": job["status"],
+            "fields": job["fields"],
+            "result": job["result"],
+            "error": job["error"],
+            **{key: job["meta"].get(key) for key in ("cached", "coalesced", "reasked_fields", "defaulted_fields",
+                                                    "routed_model")},
+        })
+
+
+def serve(host="0.0.0.0", port=8000, client=None):
+    """Run the API on the LLM client's loop until interrupted"""
+    client = client or get_client()
+    api = MatcherAPI(client)
+    server = uvicorn.Server(uvicorn.Config(api.app, host=host, port=port, lifespan="off"))
+    future = client.submit(server.serve())
+    try:
+        future.result()
+    except KeyboardInterrupt:
+        server.should_exit = True
+        future.result(timeout=10)
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Serve the resume matcher over HTTP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", 8000)))
+    args = parser.parse_args(argv)
+    serve(args.host, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
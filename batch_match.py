@@ -0,0 +1,147 @@
+# batch_match.py
+"""Headless batch matching: every resume in a directory against every job description.
+
+Example:
+    python batch_match.py --resumes resumes/ --jds jds/ --out results.jsonl --concurrency 8
+    python batch_match.py --resumes applicants.zip --jds jd.txt --top-k 20
+    python batch_match.py --resumes resumes/ --jds jds/ --export exports/ --export-format parquet
+"""
+import os
+import sys
+import json
+import argparse
+import importlib.util
+
+from dotenv import load_dotenv
+
+from engine import MODEL_OPTIONS, ANALYSIS_DEPTHS, DEFAULT_MODEL, DEFAULT_DEPTH, DEFAULT_TEMPERATURE, match_batch
+from llm_client import MODEL_LIMITS, DEFAULT_LIMITS, AsyncLLMClient
+from metrics import get_metrics
+from ingest import Ingestor
+from corpus_store import CorpusStore
+from result_cache import AnalysisCache
+from results import EXPORT_FORMATS, AnalysisRecord, export
+
+
+def _unique_id(name, documents) -> str:
+    """`name`, or `name#2`, `name#3`... when another archive / directory already used it"""
+    doc_id, n = name, 1
+    while doc_id in documents:
+        n += 1
+        doc_id = f"{name}#{n}"
+    return doc_id
+
+
+def load_documents(path, ingestor) -> dict:
+    """Ingest a single file, a zip archive, or every PDF/text file (and archive) in a directory.
+
+    Returns {unique id: IngestedDocument}. Texts stay spilled in the ingestor's
+    directory and are read only when a pair is analyzed, so `ingestor` must
+    stay open for the whole run.
+    """
+    documents = {}
+    for doc in ingestor.iter_path(path):
+        if not doc.error and doc.read_text().strip():
+            documents[_unique_id(doc.name, documents)] = doc
+        else:
+            print(f"skipping {doc.name}: {doc.error or 'no extractable text'}", file=sys.stderr)
+    stats = ingestor.stats
+    print(f"ingested {stats.documents} documents from {path}: {stats.pages} pages at "
+          f"{stats.pages_per_sec:.1f} pages/sec, {stats.rejected} rejected", file=sys.stderr)
+    return documents
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Score many resumes against many job descriptions.")
+    parser.add_argument("--resumes", required=True, help="Resume file, zip archive or directory of PDF/text files")
+    parser.add_argument("--jds", required=True, help="Job description file, zip archive or directory of PDF/text files")
+    parser.add_argument("--out", default="-", help="JSONL output path (default: stdout)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, choices=MODEL_OPTIONS)
+    parser.add_argument("--depth", default=DEFAULT_DEPTH, choices=ANALYSIS_DEPTHS)
+    parser.add_argument("--temperature", type=float, default=DEFAULT_TEMPERATURE)
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum LLM calls in flight")
+    parser.add_argument("--rpm", type=int, help="Override the model's requests-per-minute budget")
+    parser.add_argument("--tpm", type=int, help="Override the model's tokens-per-minute budget")
+    parser.add_argument("--top-k", type=int, help="Pre-rank resumes locally and fully analyze only the best K per JD")
+    parser.add_argument("--sectioned", action="store_true", help="Run parallel per-section calls per pair")
+    parser.add_argument("--jd-profile", action="store_true",
+                        help="Condense each JD once into a cached profile and score resumes against it")
+    parser.add_argument("--store", action="store_true", help="Save results to the persistent corpus store")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk result cache")
+    parser.add_argument("--export", metavar="DIR", help="Also write columnar results and a skill matrix here")
+    parser.add_argument("--export-format", default="csv", choices=EXPORT_FORMATS,
+                        help="csv, or parquet (needs pyarrow)")
+    return parser
+
+
+def main(argv=None):
+    load_dotenv()
+    args = build_parser().parse_args(argv)
+    if not os.getenv("GROQ_API_KEY"):
+        print("GROQ_API_KEY not found. Please set it in your .env file.", file=sys.stderr)
+        return 2
+    if args.export and args.export_format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        # Fail before the batch runs rather than after
+        print("--export-format parquet needs the `pyarrow` package.", file=sys.stderr)
+        return 2
+
+    # Spilled texts must outlive the batch: documents are read pair by pair
+    with Ingestor() as resume_ingestor, Ingestor() as jd_ingestor:
+        return run_batch(args, load_documents(args.resumes, resume_ingestor), load_documents(args.jds, jd_ingestor))
+
+
+def run_batch(args, resumes, jds) -> int:
+    print(f"matching {len(resumes)} resumes x {len(jds)} job descriptions", file=sys.stderr)
+
+    limits = dict(MODEL_LIMITS.get(args.model, DEFAULT_LIMITS))
+    limits.update({name: value for name, value in (("rpm", args.rpm), ("tpm", args.tpm)) if value})
+    # Only the analysis model is overridden; the profile and section models keep their own budgets
+    client = AsyncLLMClient(max_in_flight=args.concurrency, limits={**MODEL_LIMITS, args.model: limits})
+
+    store = CorpusStore() if args.store else None
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    failures = 0
+    records = [] if args.export else None
+    try:
+        for record in match_batch(
+            resumes,
+            jds,
+            model=args.model,
+            temperature=args.temperature,
+            depth=args.depth,
+            max_concurrency=args.concurrency,
+            client=client,
+            cache=None if args.no_cache else AnalysisCache(),
+            sectioned=args.sectioned,
+            top_k=args.top_k,
+            jd_profile=args.jd_profile,
+        ):
+            failures += "error" in record
+            if store is not None and "error" not in record:
+                store.add_analysis(resumes[record["resume_id"]].read_text(), jds[record["jd_id"]].read_text(),
+                                   record["result"], model=args.model, depth=args.depth,
+                                   resume_name=record["resume_id"], jd_title=record["jd_id"])
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if records is not None:
+                records.append(AnalysisRecord.from_batch(record))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        get_metrics().flush()
+    if records is not None:
+        paths = export(records, args.export, args.export_format)
+        print(f"exported {len(records)} results to {', '.join(paths)}", file=sys.stderr)
+    usage = get_metrics().summary()["models"].get(args.model)
+    if usage:
+        print(f"{usage['calls']} LLM calls, {usage['input_tokens']} input / {usage['output_tokens']} output tokens, "
+              f"${usage['cost_usd']:.4f}", file=sys.stderr)
+    prefix = get_metrics().prefixes.stats()
+    if prefix["prompts"]:
+        # Share of prompt characters repeating an earlier prompt's start - the provider prefix cache's ceiling
+        print(f"shared prompt prefix: {prefix['shared_ratio']:.1%} of {prefix['chars']} chars", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
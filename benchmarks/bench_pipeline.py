@@ -0,0 +1,276 @@
+# benchmarks/bench_pipeline.py
+"""Offline throughput / latency benchmark for the analysis pipeline.
+
+Runs PDF extraction over a synthetic corpus (plus Resume.pdf when present), the
+same corpus as a zip through the streaming ingestor, and then full analyses
+against a local fake Groq server at several concurrency levels - no Groq key or
+network needed. The fake server either replays recorded
+completions (--responses, JSONL) or serves a canned result with a configurable
+latency / generation-speed / error model.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --concurrency 1 4 16 --latency 0.4 --tokens-per-second 300
+    python benchmarks/bench_pipeline.py --mode stream --malformed-rate 0.1 --out report.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import zipfile
+import tempfile
+import argparse
+import statistics
+
+# Keep benchmark spans out of the app's metrics log / Prometheus file
+os.environ.setdefault("METRICS_LOG_PATH", "")
+os.environ.setdefault("METRICS_PROM_PATH", "")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pypdf import PdfReader  # noqa: E402
+
+from engine import DEFAULT_MODEL, MODEL_OPTIONS, AnalysisParseError, aanalyze, astream_analysis  # noqa: E402
+from fake_groq import FakeGroqConfig, load_responses, start_server  # noqa: E402
+from ingest import Ingestor  # noqa: E402
+from llm_client import AsyncLLMClient  # noqa: E402
+from metrics import get_metrics, percentile  # noqa: E402
+from pdf_extract import clear_memory_cache, extract_pdf_text  # noqa: E402
+from skill_matcher import SKILL_ALIASES  # noqa: E402
+
+UNLIMITED = {"rpm": 10 ** 6, "tpm": 10 ** 9}
+RESUME_PAGES = (1, 1, 2, 2, 3, 5)  # cycled over the synthetic resumes
+JD_WORDS = (80, 250, 800)          # small / medium / large job descriptions
+FILLER = (
+    "Led a cross-functional team to deliver {skill} services used by thousands of customers. "
+    "Reduced latency by {n}% after profiling and redesigning the {skill} pipeline. "
+    "Mentored {n2} engineers and owned on-call for production {skill} workloads. "
+    "Collaborated with product and design on roadmap planning and quarterly goals."
+).split(". ")
+
+
+# ------------------------------
+# Synthetic corpus
+# ------------------------------
+def _escape(text) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages) -> bytes:
+    """Minimal valid PDF with one Helvetica text block per page; `pages` is a list of line lists"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 790 Td " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode("latin-1"))
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents {len(objects)} 0 R "
+                       "/Resources << /Font << /F1 3 0 R >> >> >>".encode("latin-1"))
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("latin-1")
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def synthetic_resume(rng, index, pages) -> list:
+    skills = rng.sample(sorted(SKILL_ALIASES), 12)
+    content = [[f"Candidate {index}", "Senior Software Engineer", "Skills: " + ", ".join(skills[:8])]]
+    for page in range(pages):
+        lines = content[0] if page == 0 else []
+        lines.append("Experience" if page == 0 else f"Experience (continued {page})")
+        while len(lines) < 60:
+            sentence = rng.choice(FILLER).format(skill=rng.choice(skills), n=rng.randint(10, 60), n2=rng.randint(2, 9))
+            lines.append(sentence.strip()[:95])
+        if page:
+            content.append(lines)
+    return content
+
+
+def synthetic_jd(rng, index, words) -> str:
+    skills = rng.sample(sorted(SKILL_ALIASES), 10)
+    text = [f"Job {index}: Backend Engineer", "Requirements:"] + [f"- {skill} experience" for skill in skills[:6]]
+    while sum(len(line.split()) for line in text) < words:
+        text.append(rng.choice(FILLER).format(skill=rng.choice(skills), n=rng.randint(10, 60), n2=rng.randint(2, 9)))
+    return "\n".join(text)
+
+
+def build_corpus(n_resumes, n_jds, seed) -> tuple:
+    """([(name, pdf_bytes), ...], [jd_text, ...])"""
+    rng = random.Random(seed)
+    pdfs = [(f"synthetic_{i}.pdf", make_pdf(synthetic_resume(rng, i, RESUME_PAGES[i % len(RESUME_PAGES)])))
+            for i in range(n_resumes)]
+    sample = os.path.join(ROOT, "Resume.pdf")
+    if os.path.exists(sample):
+        with open(sample, "rb") as f:
+            pdfs.append(("Resume.pdf", f.read()))
+    jds = [synthetic_jd(rng, i, JD_WORDS[i % len(JD_WORDS)]) for i in range(n_jds)]
+    return pdfs, jds
+
+
+# ------------------------------
+# Stages
+# ------------------------------
+def bench_pdf(pdfs, rounds) -> tuple:
+    """Cold extraction throughput (memory cache cleared every round); returns (report, texts)"""
+    pages = sum(len(PdfReader(io.BytesIO(data)).pages) for _, data in pdfs)
+    texts, elapsed = [], 0.0
+    for _ in range(rounds):
+        clear_memory_cache()
+        started = time.perf_counter()
+        texts = [extract_pdf_text(data) for _, data in pdfs]
+        elapsed += time.perf_counter() - started
+    return {
+        "documents": len(pdfs),
+        "pages": pages,
+        "rounds": rounds,
+        "pages_per_sec": round(pages * rounds / elapsed, 1),
+        "ms_per_document": round(elapsed / (len(pdfs) * rounds) * 1000, 2),
+    }, texts
+
+
+def bench_ingest(pdfs, rounds) -> dict:
+    """Streaming ingestion of the corpus as one zip archive (entry by entry, text spilled to disk)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_path = os.path.join(tmp, "corpus.zip")
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, data in pdfs:
+                archive.writestr(name, data)
+        with Ingestor(spill_dir=os.path.join(tmp, "spill")) as ingestor:
+            for _ in range(rounds):
+                for _doc in ingestor.iter_archive(archive_path):
+                    pass
+        return {"archive_bytes": os.path.getsize(archive_path), "rounds": rounds, **ingestor.stats.as_dict()}
+
+
+async def _run_level(client, pairs, concurrency, mode, model) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures, repaired, errors = [], 0, 0, 0
+
+    async def one(jd_text, resume_text):
+        nonlocal failures, repaired, errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if mode == "stream":
+                    run = None
+                    async for event in astream_analysis(jd_text, resume_text, model, client=client):
+                        if event[0] == "done":
+                            run = event[1]
+                else:
+                    run = await aanalyze(jd_text, resume_text, model, client=client, sectioned=mode == "sections")
+            except AnalysisParseError:
+                failures += 1
+                return
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+            failures += bool(run.defaulted_fields)
+            repaired += bool(run.reasked_fields)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(jd, resume) for jd, resume in pairs))
+    wall = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "analyses": len(pairs),
+        "wall_s": round(wall, 3),
+        "analyses_per_sec": round(len(latencies) / wall, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "parse_failure_rate": round(failures / len(pairs), 4),
+        "reask_rate": round(repaired / len(pairs), 4),
+        "errors": errors,
+        "retries": client.retries,
+    }
+
+
+def bench_level(pairs, concurrency, base_url, mode, model, limits) -> dict:
+    """One concurrency level on a fresh client (streams must be iterated on the client loop)"""
+    client = AsyncLLMClient(api_key="fake", base_url=base_url, max_in_flight=concurrency, limits=limits)
+    try:
+        return client.submit(_run_level(client, pairs, concurrency, mode, model)).result()
+    finally:
+        client.close()
+
+
+# ------------------------------
+# CLI
+# ------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction and analyses against a fake Groq server.")
+    parser.add_argument("--resumes", type=int, default=12, help="Synthetic resume PDFs to generate")
+    parser.add_argument("--jds", type=int, default=6, help="Synthetic job descriptions to generate")
+    parser.add_argument("--analyses", type=int, default=48, help="Distinct resume/JD pairs per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--mode", choices=["invoke", "stream", "sections"], default="invoke",
+                        help="Single prompt, streamed single prompt (the UI path) or parallel sections")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--respect-limits", action="store_true", help="Apply the model's real RPM/TPM buckets")
+    parser.add_argument("--pdf-rounds", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake server seconds to first token")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of truncated JSON responses")
+    parser.add_argument("--responses", help="JSONL of recorded completions to replay")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Also write the JSON report here")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    pdfs, jds = build_corpus(args.resumes, args.jds, args.seed)
+    pdf_report, resume_texts = bench_pdf(pdfs, args.pdf_rounds)
+    ingest_report = bench_ingest(pdfs, args.pdf_rounds)
+
+    # Distinct pairs only: repeats would be coalesced by the single-flight layer and skew throughput
+    all_pairs = [(jd, resume) for resume in resume_texts for jd in jds]
+    pairs = random.Random(args.seed).sample(all_pairs, min(args.analyses, len(all_pairs)))
+
+    config = FakeGroqConfig(args.latency, args.jitter, args.tokens_per_second, args.error_rate,
+                            responses=load_responses(args.responses) if args.responses else None,
+                            malformed_rate=args.malformed_rate)
+    server, base_url = start_server(config)
+    # Parallel sections also call the 8B model, so lift the limits for every model
+    limits = None if args.respect_limits else {name: UNLIMITED for name in MODEL_OPTIONS}
+    try:
+        levels = [bench_level(pairs, concurrency, base_url, args.mode, args.model, limits)
+                  for concurrency in args.concurrency]
+    finally:
+        server.shutdown()
+
+    report = {
+        "mode": args.mode,
+        "model": args.model,
+        "fake_server": {"latency": args.latency, "jitter": args.jitter, "tokens_per_second": args.tokens_per_second,
+                        "error_rate": args.error_rate, "malformed_rate": args.malformed_rate,
+                        "replayed_responses": len(config.responses), "requests": config.requests},
+        "pdf": pdf_report,
+        "ingest": ingest_report,
+        "levels": levels,
+        "prompt_prefix": get_metrics().prefixes.stats(),
+        "stages": {stage: {key: round(value, 2) for key, value in stats.items()}
+                   for stage, stats in get_metrics().summary()["stages"].items()},
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# benchmarks/bench_rerun.py
+"""Startup and rerun-time benchmark for the Streamlit script.
+
+Measures the cold import cost of the app's modules and the wall time of
+repeated script reruns (what every widget interaction pays) using
+Streamlit's AppTest harness. No Groq key is needed - nothing is analyzed.
+
+    python benchmarks/bench_rerun.py --reruns 30
+    python benchmarks/bench_rerun.py --reruns 30 --max-p50-ms 250   # fail on regression
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_PROBE = """
+import time, json
+started = time.perf_counter()
+import engine, result_cache, pdf_extract
+json.dump({"import_ms": (time.perf_counter() - started) * 1000}, __import__("sys").stdout)
+"""
+
+
+def cold_import_ms() -> float:
+    """Import the engine modules in a fresh interpreter so nothing is already cached"""
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output)["import_ms"]
+
+
+def percentile(samples, pct) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def rerun_samples(reruns) -> tuple:
+    from streamlit.testing.v1 import AppTest
+
+    os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    sys.path.insert(0, ROOT)
+    app = AppTest.from_file(os.path.join(ROOT, "model.py"), default_timeout=60)
+
+    started = time.perf_counter()
+    app.run()
+    first_run_ms = (time.perf_counter() - started) * 1000
+
+    samples = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return first_run_ms, samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Streamlit startup and rerun latency.")
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--max-p50-ms", type=float, help="Exit non-zero if the rerun p50 exceeds this")
+    args = parser.parse_args(argv)
+
+    import_ms = cold_import_ms()
+    first_run_ms, samples = rerun_samples(args.reruns)
+    report = {
+        "cold_import_ms": round(import_ms, 1),
+        "first_run_ms": round(first_run_ms, 1),
+        "rerun_p50_ms": round(statistics.median(samples), 1),
+        "rerun_p95_ms": round(percentile(samples, 95), 1),
+        "reruns": len(samples),
+    }
+    print(json.dumps(report, indent=2))
+    if args.max_p50_ms and report["rerun_p50_ms"] > args.max_p50_ms:
+        print(f"rerun p50 {report['rerun_p50_ms']}ms exceeds budget {args.max_p50_ms}ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
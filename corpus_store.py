@@ -0,0 +1,215 @@
+# corpus_store.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from result_cache import normalize_text
+from results import normalize_skill, split_list
+from skill_matcher import get_skill_index
+
+DEFAULT_STORE_PATH = os.environ.get("CORPUS_STORE_PATH", os.path.join(".cache", "corpus.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resumes (
+    id INTEGER PRIMARY KEY,
+    digest TEXT UNIQUE NOT NULL,
+    name TEXT,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jds (
+    id INTEGER PRIMARY KEY,
+    digest TEXT UNIQUE NOT NULL,
+    title TEXT,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    resume_id INTEGER NOT NULL REFERENCES resumes(id),
+    jd_id INTEGER NOT NULL REFERENCES jds(id),
+    model TEXT,
+    depth TEXT,
+    match_percentage INTEGER,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_pair ON analyses(resume_id, jd_id);
+-- Inverted indexes: normalized skill -> resumes / analyses
+CREATE TABLE IF NOT EXISTS resume_skills (
+    skill TEXT NOT NULL,
+    resume_id INTEGER NOT NULL,
+    PRIMARY KEY (skill, resume_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS analysis_skills (
+    skill TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    analysis_id INTEGER NOT NULL,
+    PRIMARY KEY (skill, kind, analysis_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_analysis_skills_analysis ON analysis_skills(analysis_id, kind);
+CREATE VIRTUAL TABLE IF NOT EXISTS resume_fts USING fts5(text, content='resumes', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS resumes_fts_insert AFTER INSERT ON resumes BEGIN
+    INSERT INTO resume_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+
+def _digest(text) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class CorpusStore:
+    """Persistent SQLite store for resumes, JDs and parsed analyses, with an FTS5
+    full-text index over resume text and an inverted skill -> resume index."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # ------------------------------
+    # Writes
+    # ------------------------------
+    def add_resume(self, text, name=None) -> int:
+        """Insert a resume (deduplicated by normalized content) and index its skills"""
+        digest = _digest(text)
+        with self._lock, self._connect() as conn:
+            # OR IGNORE: another process sharing the file may insert the same digest first
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO resumes (digest, name, text, created_at) VALUES (?, ?, ?, ?)",
+                (digest, name, text, time.time()),
+            )
+            if not inserted.rowcount:
+                return conn.execute("SELECT id FROM resumes WHERE digest = ?", (digest,)).fetchone()[0]
+            resume_id = inserted.lastrowid
+            skills = {skill.lower() for skill in get_skill_index().extract(text)}
+            conn.executemany("INSERT OR IGNORE INTO resume_skills VALUES (?, ?)",
+                             [(skill, resume_id) for skill in skills])
+            return resume_id
+
+    def add_jd(self, text, title=None) -> int:
+        digest = _digest(text)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jds (digest, title, text, created_at) VALUES (?, ?, ?, ?)",
+                (digest, title, text, time.time()),
+            )
+            return conn.execute("SELECT id FROM jds WHERE digest = ?", (digest,)).fetchone()[0]
+
+    def add_analysis(self, resume_text, jd_text, result, model=None, depth=None,
+                     resume_name=None, jd_title=None) -> int:
+        """Store a parsed ResumeAnalysisResult and index its matched/missing/extra skills"""
+        resume_id = self.add_resume(resume_text, resume_name)
+        jd_id = self.add_jd(jd_text, jd_title)
+        skills = {
+            kind: {normalize_skill(skill) for skill in split_list(result.get(f"skills_{kind}"))}
+            for kind in ("matched", "missing", "extra")
+        }
+        with self._lock, self._connect() as conn:
+            analysis_id = conn.execute(
+                "INSERT INTO analyses (resume_id, jd_id, model, depth, match_percentage, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (resume_id, jd_id, model, depth, int(result.get("overall_match_percentage") or 0),
+                 json.dumps(result, ensure_ascii=False), time.time()),
+            ).lastrowid
+            conn.executemany("INSERT OR IGNORE INTO analysis_skills VALUES (?, ?, ?)",
+                             [(skill, kind, analysis_id) for kind, names in skills.items() for skill in names])
+            # Skills the LLM found in the resume count as "has" too
+            conn.executemany("INSERT OR IGNORE INTO resume_skills VALUES (?, ?)",
+                             [(skill, resume_id) for skill in skills["matched"] | skills["extra"]])
+        return analysis_id
+
+    # ------------------------------
+    # Queries
+    # ------------------------------
+    def find_candidates(self, has=(), missing=(), only_missing=False, jd_id=None, limit=100) -> list:
+        """Candidates answered from the skill index, best match first.
+
+        has:          skills the resume must contain (all of them)
+        missing:      skills an analysis must list as missing (all of them)
+        only_missing: the analysis' missing set must be exactly `missing`
+        jd_id:        restrict to analyses against one job description
+
+        e.g. find_candidates(has=["Kubernetes", "Go"], missing=["Terraform"], only_missing=True)
+        """
+        has = sorted({normalize_skill(skill) for skill in has})
+        missing = sorted({normalize_skill(skill) for skill in missing})
+        where, params = [], []
+        if has:
+            where.append(
+                f"a.resume_id IN (SELECT resume_id FROM resume_skills WHERE skill IN ({','.join('?' * len(has))}) "
+                "GROUP BY resume_id HAVING COUNT(*) = ?)"
+            )
+            params += has + [len(has)]
+        if missing:
+            where.append(
+                "(SELECT COUNT(*) FROM analysis_skills s WHERE s.analysis_id = a.id AND s.kind = 'missing' "
+                f"AND s.skill IN ({','.join('?' * len(missing))})) = ?"
+            )
+            params += missing + [len(missing)]
+        if only_missing:
+            where.append(
+                "(SELECT COUNT(*) FROM analysis_skills s WHERE s.analysis_id = a.id AND s.kind = 'missing') = ?"
+            )
+            params.append(len(missing))
+        if jd_id is not None:
+            where.append("a.jd_id = ?")
+            params.append(jd_id)
+        sql = (
+            "SELECT a.id, a.resume_id, r.name, a.jd_id, a.match_percentage, a.model, a.depth "
+            "FROM analyses a JOIN resumes r ON r.id = a.resume_id "
+            + ("WHERE " + " AND ".join(where) + " " if where else "")
+            + "ORDER BY a.match_percentage DESC, a.id DESC LIMIT ?"
+        )
+        with self._connect() as conn:
+            rows = conn.execute(sql, params + [limit]).fetchall()
+        columns = ["analysis_id", "resume_id", "resume_name", "jd_id", "match_percentage", "model", "depth"]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def resumes_with_skills(self, skills) -> list:
+        """Resume ids containing every skill in `skills` (no analysis required)"""
+        skills = sorted({normalize_skill(skill) for skill in skills})
+        if not skills:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT resume_id FROM resume_skills WHERE skill IN ({','.join('?' * len(skills))}) "
+                "GROUP BY resume_id HAVING COUNT(*) = ?",
+                skills + [len(skills)],
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def search_resumes(self, query, limit=20) -> list:
+        """Full-text search over resume text (FTS5 syntax), best rank first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT r.id, r.name, snippet(resume_fts, 0, '[', ']', '...', 12) FROM resume_fts "
+                "JOIN resumes r ON r.id = resume_fts.rowid WHERE resume_fts MATCH ? ORDER BY rank LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        return [{"resume_id": row[0], "resume_name": row[1], "snippet": row[2]} for row in rows]
+
+    def get_analysis(self, analysis_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT result FROM analyses WHERE id = ?", (analysis_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def latest_analysis(self, resume_text, jd_text):
+        """Most recent stored result for this exact resume/JD pair, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT a.result FROM analyses a JOIN resumes r ON r.id = a.resume_id JOIN jds j ON j.id = a.jd_id "
+                "WHERE r.digest = ? AND j.digest = ? ORDER BY a.id DESC LIMIT 1",
+                (_digest(resume_text), _digest(jd_text)),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
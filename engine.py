@@ -0,0 +1,769 @@
+# engine.py
+import json
+import time
+import hashlib
+import queue
+import asyncio
+import threading
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator, Iterator
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field
+
+from jd_profile import aget_jd_profile, format_profile, is_fallback, profile_fingerprint
+from json_repair import coerce_fields, fill_defaults, repair_json
+from llm_client import OUTPUT_TOKEN_RESERVE, AsyncLLMClient
+from metrics import get_metrics
+from partial_json import IncrementalObjectParser
+from prompt_budget import (
+    DROPPED_SECTIONS, PROMPT_TOKEN_BUDGETS, SECTION_HEADINGS, count_tokens, prepare_inputs, segment
+)
+from result_cache import make_cache_key
+from router import AUTO_MODEL
+from skill_matcher import local_analysis
+
+# ------------------------------
+# Models / Options
+# ------------------------------
+MODEL_OPTIONS = [
+    "llama-3.1-8b-instant",
+    "qwen/qwen3-32b",
+    "llama-3.3-70b-versatile",
+    "openai/gpt-oss-120b"
+]
+ANALYSIS_DEPTHS = ["Quick", "Standard", "Deep", "Comprehensive"]
+DEFAULT_MODEL = MODEL_OPTIONS[0]
+DEFAULT_DEPTH = "Standard"
+DEFAULT_TEMPERATURE = 0.1
+# Depths answered by the local skill matcher alone, with no network call
+LOCAL_ONLY_DEPTHS = {"Quick"}
+
+
+# ------------------------------
+# Structured Output / Prompts
+# ------------------------------
+# Pydantic model for structured output
+class ResumeAnalysisResult(BaseModel):
+    skills_matched: str = Field(description="Skills present in both JD and resume - comma-separated string")
+    skills_missing: str = Field(description="Critical skills missing from resume - comma-separated string")
+    skills_extra: str = Field(description="Additional skills in resume not required by JD - comma-separated string")
+    experience_match: str = Field(description="How well experience aligns with requirements")
+    education_match: str = Field(description="Education alignment assessment")
+    overall_match_percentage: int = Field(description="Overall match percentage (0-100)")
+    selection_probability: str = Field(description="Likelihood of selection (High/Medium/Low)")
+    strength_areas: str = Field(description="Top 3 candidate strengths - comma-separated string")
+    improvement_areas: str = Field(description="Top 3 areas needing improvement - comma-separated string")
+    specific_recommendations: str = Field(description="Actionable improvement steps - comma-separated string")
+    interview_preparation: str = Field(description="Suggested interview focus areas - comma-separated string")
+    salary_competitiveness: str = Field(description="Salary negotiation position assessment")
+
+RESULT_FIELDS = list(ResumeAnalysisResult.model_fields)
+FIELD_TYPES = {name: int if info.annotation is int else str for name, info in ResumeAnalysisResult.model_fields.items()}
+
+output_parser = JsonOutputParser(pydantic_object=ResumeAnalysisResult)
+format_instructions = output_parser.get_format_instructions()
+
+# One line per field instead of the full JSON schema dump - same contract, far fewer tokens
+compact_format_instructions = "A single JSON object with exactly these keys:\n" + "\n".join(
+    f'"{name}": {"integer" if info.annotation is int else "string"} - {info.description}'
+    for name, info in ResumeAnalysisResult.model_fields.items()
+)
+
+SYSTEM_PROMPT = """You are a senior HR consultant.
+CRITICAL: For all list/array fields, return comma-separated strings, NOT JSON arrays.
+Example: "Python, JavaScript, React" NOT ["Python", "JavaScript", "React"]
+Return only valid JSON following the exact schema provided."""
+
+# Everything that is identical across requests comes first, in one canonical form, followed
+# by the JD (shared by a whole batch) and only then the per-request parts. Providers that
+# cache prompt prefixes can then reuse all of it up to the resume.
+ANALYSIS_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+
+Provide a comprehensive resume-job matching analysis.
+
+IMPORTANT: For all array fields (skills_matched, skills_missing, skills_extra, strength_areas, improvement_areas, specific_recommendations, interview_preparation), return the values as comma-separated strings, NOT as arrays.
+
+For example:
+- CORRECT: "Python, JavaScript, React, Node.js"
+- WRONG: ["Python", "JavaScript", "React", "Node.js"]
+
+Perform detailed analysis:
+
+1. **Skill Matching**:
+   - Extract complete skill names (not individual characters)
+   - Match technical skills, soft skills, tools, technologies
+   - Consider synonyms (e.g., "JS" = "JavaScript", "React.js" = "React")
+
+2. **Experience Analysis**: Compare years, relevance, industry alignment
+
+3. **Education Assessment**: Degree requirements vs candidate qualifications
+
+4. **Overall Scoring**: Weighted scoring based on critical vs nice-to-have requirements
+
+Return analysis following this exact format:
+""" + compact_format_instructions
+
+prompt_compare = PromptTemplate(
+    input_variables=["job_description", "resume_text", "depth"],
+    template="""Job Description:
+{job_description}
+
+Resume:
+{resume_text}
+
+Analysis depth: {depth}"""
+)
+
+PROMPT_FINGERPRINT = ANALYSIS_SYSTEM_PROMPT + prompt_compare.template + str(PROMPT_TOKEN_BUDGETS)
+# Tokens of a full-analysis request besides the documents: instructions plus the completion
+ROUTE_FIXED_TOKENS = count_tokens(ANALYSIS_SYSTEM_PROMPT + prompt_compare.template) + OUTPUT_TOKEN_RESERVE
+
+# ------------------------------
+# Section Prompts (parallel mode)
+# ------------------------------
+# Independent sub-analyses that together cover every ResumeAnalysisResult field
+ANALYSIS_SECTIONS = {
+    "skills": ["skills_matched", "skills_missing", "skills_extra"],
+    "experience_education": ["experience_match", "education_match", "overall_match_percentage",
+                             "selection_probability", "strength_areas", "improvement_areas"],
+    "recommendations": ["specific_recommendations", "interview_preparation"],
+    "salary": ["salary_competitiveness"],
+}
+# Lexical/short sections go to the fast model; unlisted sections use the selected model
+DEFAULT_SECTION_MODELS = {
+    "skills": "llama-3.1-8b-instant",
+    "salary": "llama-3.1-8b-instant",
+}
+EXECUTION_MODES = ["Single prompt", "Parallel sections"]
+
+SECTION_FOCUS = {
+    "skills": "Extract complete skill names and match technical skills, soft skills, tools and technologies. "
+              "Consider synonyms (e.g., \"JS\" = \"JavaScript\", \"React.js\" = \"React\").",
+    "experience_education": "Compare years, relevance and industry alignment of experience, and degree "
+                            "requirements vs candidate qualifications. Score overall fit weighting critical "
+                            "requirements above nice-to-haves.",
+    "recommendations": "Give actionable resume improvements and the interview topics the candidate should prepare.",
+    "salary": "Assess the candidate's salary negotiation position for this role.",
+}
+REASK_FOCUS = "A previous answer was incomplete. Provide ONLY the fields listed below."
+
+# Sections and re-asks differ only in focus and fields, so those go after both documents:
+# every section of one pair then shares the prefix up to the end of the resume.
+SECTION_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+
+Perform one part of a resume-job matching analysis.
+For list fields, return the values as comma-separated strings, NOT as arrays."""
+
+prompt_section = PromptTemplate(
+    input_variables=["job_description", "resume_text", "format_instructions", "depth", "focus"],
+    template="""Job Description:
+{job_description}
+
+Resume:
+{resume_text}
+
+Analysis depth: {depth}
+
+Focus: {focus}
+
+Return analysis following this exact format:
+{format_instructions}"""
+)
+
+
+def fields_format_instructions(fields):
+    return "A single JSON object with exactly these keys:\n" + "\n".join(
+        line for line in compact_format_instructions.splitlines()[1:]
+        if line.split('"')[1] in fields
+    )
+
+
+SECTION_FORMAT_INSTRUCTIONS = {
+    section: fields_format_instructions(fields) for section, fields in ANALYSIS_SECTIONS.items()
+}
+
+
+class AnalysisParseError(Exception):
+    """Raised when the LLM response cannot be parsed into a ResumeAnalysisResult"""
+
+    def __init__(self, message, raw_output):
+        super().__init__(message)
+        self.raw_output = raw_output
+
+
+@dataclass
+class AnalysisRun:
+    result: dict
+    raw_output: str
+    cached: bool = False
+    elapsed: float = 0.0
+    # Fields recovered by a targeted re-ask / filled with defaults after local JSON repair
+    reasked_fields: list = field(default_factory=list)
+    defaulted_fields: list = field(default_factory=list)
+    # Result shared from an identical request that was already in flight
+    coalesced: bool = False
+    # Fields carried over from the previous analysis because their inputs did not change
+    reused_fields: list = field(default_factory=list)
+    # Model the router picked when the request asked for AUTO_MODEL
+    routed_model: str = ""
+
+
+# ------------------------------
+# Single Analysis
+# ------------------------------
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> AsyncLLMClient:
+    """Process-wide LLM client shared by the UI, batch runs and background work"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AsyncLLMClient()
+        return _client
+
+
+async def aroute_model(job_description, resume_text, depth, client, prefer=None) -> str:
+    """Resolve AUTO_MODEL to a concrete model for this request (see router.ModelRouter)"""
+    input_tokens = count_tokens(job_description) + count_tokens(resume_text)
+    return await client.router.aroute(depth, input_tokens, ROUTE_FIXED_TOKENS, prefer=prefer)
+
+
+def build_messages(job_description, resume_text, depth=DEFAULT_DEPTH, model=DEFAULT_MODEL, profile=None):
+    """System + human messages with both documents packed into the model's token budget.
+
+    With a JD `profile` the compact profile is sent in place of the job description.
+    """
+    with get_metrics().span("prompt_format", model):
+        inputs = prepare_inputs(job_description, resume_text, model, profile and format_profile(profile))
+        human_msg = HumanMessage(content=prompt_compare.format(
+            job_description=inputs["job_description"],
+            resume_text=inputs["resume_text"],
+            depth=depth
+        ))
+    return [SystemMessage(content=ANALYSIS_SYSTEM_PROMPT), human_msg]
+
+
+def parse_output(raw_output, fields=RESULT_FIELDS) -> tuple:
+    """Parse and locally repair an LLM response; returns (recovered fields, missing field names)"""
+    with get_metrics().span("parse") as span:
+        result, missing = repair_json(raw_output, {name: FIELD_TYPES[name] for name in fields})
+        span["missing"] = len(missing)
+    if not result:
+        raise AnalysisParseError("no fields could be recovered from the response", raw_output)
+    return result, missing
+
+
+async def afinalize_output(raw_output, fields, job_description, resume_text, model, temperature, depth,
+                           client, profile=None) -> AnalysisRun:
+    """Repair the response locally, re-ask only for fields still missing, then fill defaults"""
+    result, missing = parse_output(raw_output, fields)
+    client.router.observe_parse(model, depth, bool(missing))
+    run = AnalysisRun(result, raw_output)
+    if missing:
+        messages = build_fields_messages(missing, REASK_FOCUS, job_description, resume_text, depth, model, profile)
+        try:
+            response = await client.ainvoke(messages, model, temperature)
+            reasked, missing = repair_json(response.content, {name: FIELD_TYPES[name] for name in missing})
+            result.update(reasked)
+            run.reasked_fields = list(reasked)
+        except Exception:
+            pass
+        run.defaulted_fields = missing
+    run.result = fill_defaults(result, {name: FIELD_TYPES[name] for name in fields})
+    return run
+
+
+def _cache_key(job_description, resume_text, model, temperature, depth, profile=None):
+    return make_cache_key(job_description, resume_text, model, temperature, depth,
+                          prompt_fingerprint=PROMPT_FINGERPRINT + (profile_fingerprint(profile) if profile else ""))
+
+
+async def _profile_for(job_description, depth, jd_profile, client, cache):
+    """The JD profile to prompt with, or None when profiles are off or no LLM call is made"""
+    if not jd_profile or depth in LOCAL_ONLY_DEPTHS:
+        return None
+    return await aget_jd_profile(job_description, client, cache)
+
+
+def _analysis_cache(cache, profile):
+    """No caching for analyses built on the lexical fallback profile - a later run should redo them"""
+    return None if is_fallback(profile) else cache
+
+
+async def aanalyze(job_description, resume_text, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                   depth=DEFAULT_DEPTH, client=None, cache=None, sectioned=False, jd_profile=False) -> AnalysisRun:
+    """Run one resume/JD analysis: cache lookup, prompt, rate-limited LLM call and parse.
+
+    With `jd_profile` the JD is condensed once into a cached profile that every
+    analysis against it sends instead of the raw text.
+    """
+    started = time.perf_counter()
+    if depth in LOCAL_ONLY_DEPTHS:
+        result = local_analysis(job_description, resume_text)
+        return AnalysisRun(result, json.dumps(result, indent=2), elapsed=time.perf_counter() - started)
+    if model == AUTO_MODEL:
+        client = client or get_client()
+        routed = await aroute_model(job_description, resume_text, depth, client)
+        run = await aanalyze(job_description, resume_text, routed, temperature, depth, client=client, cache=cache,
+                             sectioned=sectioned, jd_profile=jd_profile)
+        return replace(run, routed_model=routed)
+    if sectioned:
+        return await aanalyze_sectioned(job_description, resume_text, model, temperature, depth,
+                                        client=client, cache=cache, jd_profile=jd_profile)
+
+    client = client or get_client()
+    profile = await _profile_for(job_description, depth, jd_profile, client, cache)
+    cache = _analysis_cache(cache, profile)
+    cache_key = _cache_key(job_description, resume_text, model, temperature, depth, profile)
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            return AnalysisRun(cached, "", cached=True, elapsed=time.perf_counter() - started)
+
+    async def compute():
+        response = await client.ainvoke(build_messages(job_description, resume_text, depth, model, profile),
+                                       model, temperature)
+        run = await afinalize_output(response.content, RESULT_FIELDS, job_description, resume_text, model,
+                                     temperature, depth, client, profile)
+        if cache is not None and not run.defaulted_fields:
+            await asyncio.to_thread(cache.set, cache_key, run.result)
+        run.elapsed = time.perf_counter() - started
+        return run
+
+    return await _coalesced(client, cache_key, compute)
+
+
+async def _coalesced(client, key, compute) -> AnalysisRun:
+    """Share one in-flight computation between concurrent identical requests"""
+    leader, shared = await client.flights.join(key)
+    if not leader:
+        return replace(shared, coalesced=True)
+    try:
+        run = await compute()
+    except BaseException as exc:
+        client.flights.fail(key, exc)
+        raise
+    client.flights.resolve(key, run)
+    return run
+
+
+def analyze(job_description, resume_text, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+            depth=DEFAULT_DEPTH, client=None, cache=None, sectioned=False, jd_profile=False) -> AnalysisRun:
+    """Blocking wrapper around `aanalyze` for the Streamlit script thread"""
+    client = client or get_client()
+    coro = aanalyze(job_description, resume_text, model, temperature, depth, client=client, cache=cache,
+                    sectioned=sectioned, jd_profile=jd_profile)
+    return client.submit(coro).result()
+
+
+def iterate_on_client(client, agen) -> Iterator:
+    """Drive an async generator on the client loop and yield its items to a sync caller"""
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put(item)
+        except (Exception, asyncio.CancelledError) as e:
+            # A CancelledError from something the stream awaited must not read as a clean end
+            items.put(e)
+            if asyncio.current_task().cancelling():
+                raise
+        finally:
+            items.put(done)
+
+    client.submit(pump())
+    while (item := items.get()) is not done:
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+# ------------------------------
+# Sectioned Analysis
+# ------------------------------
+def build_fields_messages(fields, focus, job_description, resume_text, depth=DEFAULT_DEPTH, model=DEFAULT_MODEL,
+                          profile=None):
+    """Messages asking for just `fields` - used by parallel sections and targeted re-asks"""
+    with get_metrics().span("prompt_format", model):
+        inputs = prepare_inputs(job_description, resume_text, model, profile and format_profile(profile))
+        human_msg = HumanMessage(content=prompt_section.format(
+            job_description=inputs["job_description"],
+            resume_text=inputs["resume_text"],
+            format_instructions=fields_format_instructions(fields),
+            depth=depth,
+            focus=focus,
+        ))
+    return [SystemMessage(content=SECTION_SYSTEM_PROMPT), human_msg]
+
+
+def build_section_messages(section, job_description, resume_text, depth=DEFAULT_DEPTH, model=DEFAULT_MODEL,
+                           profile=None):
+    return build_fields_messages(ANALYSIS_SECTIONS[section], SECTION_FOCUS[section], job_description,
+                                 resume_text, depth, model, profile)
+
+
+def section_model(section, model, section_models=None) -> str:
+    return (DEFAULT_SECTION_MODELS if section_models is None else section_models).get(section, model)
+
+
+async def aanalyze_section(section, job_description, resume_text, model=DEFAULT_MODEL,
+                           temperature=DEFAULT_TEMPERATURE, depth=DEFAULT_DEPTH, client=None, cache=None,
+                           profile=None) -> AnalysisRun:
+    """Run one sub-analysis and return only that section's fields"""
+    started = time.perf_counter()
+    fingerprint = (f"{section}:{PROMPT_FINGERPRINT}{SECTION_SYSTEM_PROMPT}{prompt_section.template}"
+                   + (profile_fingerprint(profile) if profile else ""))
+    cache_key = make_cache_key(job_description, resume_text, model, temperature, depth, prompt_fingerprint=fingerprint)
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            return AnalysisRun(cached, "", cached=True, elapsed=time.perf_counter() - started)
+
+    client = client or get_client()
+
+    async def compute():
+        messages = build_section_messages(section, job_description, resume_text, depth, model, profile)
+        response = await client.ainvoke(messages, model, temperature)
+        run = await afinalize_output(response.content, ANALYSIS_SECTIONS[section], job_description, resume_text,
+                                     model, temperature, depth, client, profile)
+        if cache is not None and not run.defaulted_fields:
+            await asyncio.to_thread(cache.set, cache_key, run.result)
+        run.elapsed = time.perf_counter() - started
+        return run
+
+    return await _coalesced(client, cache_key, compute)
+
+
+async def aiter_sections(job_description, resume_text, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                         depth=DEFAULT_DEPTH, client=None, cache=None, section_models=None,
+                         sections=None, jd_profile=False) -> AsyncIterator[tuple]:
+    """Run the section sub-analyses concurrently, yielding (section, AnalysisRun) as each finishes"""
+    client = client or get_client()
+    profile = await _profile_for(job_description, depth, jd_profile, client, cache)
+    cache = _analysis_cache(cache, profile)
+
+    async def run(section):
+        routed_model = section_model(section, model, section_models)
+        return section, await aanalyze_section(section, job_description, resume_text, routed_model,
+                                               temperature, depth, client=client, cache=cache, profile=profile)
+
+    sections = ANALYSIS_SECTIONS if sections is None else sections
+    tasks = [asyncio.ensure_future(run(section)) for section in sections]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def astream_sections(job_description, resume_text, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                           depth=DEFAULT_DEPTH, client=None, cache=None, section_models=None,
+                           jd_profile=False) -> AsyncIterator[tuple]:
+    """Sectioned counterpart of `astream_analysis`: fields arrive a section at a time"""
+    started = time.perf_counter()
+    result, raw_outputs, all_cached = {}, {}, True
+    async for section, run in aiter_sections(job_description, resume_text, model, temperature, depth,
+                                             client=client, cache=cache, section_models=section_models,
+                                             jd_profile=jd_profile):
+        for key, value in run.result.items():
+            result[key] = value
+            yield ("field", key, value)
+        raw_outputs[section] = run.raw_output
+        all_cached = all_cached and run.cached
+    ordered = {field_name: result[field_name] for field_name in RESULT_FIELDS if field_name in result}
+    yield ("done", AnalysisRun(ordered, json.dumps(raw_outputs, indent=2), cached=all_cached,
+                               elapsed=time.perf_counter() - started))
+
+
+async def aanalyze_sectioned(job_description, resume_text, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                             depth=DEFAULT_DEPTH, client=None, cache=None, section_models=None,
+                             jd_profile=False) -> AnalysisRun:
+    """Fan the analysis out into parallel per-section calls and merge into one ResumeAnalysisResult"""
+    async for event in astream_sections(job_description, resume_text, model, temperature, depth,
+                                        client=client, cache=cache, section_models=section_models,
+                                        jd_profile=jd_profile):
+        if event[0] == "done":
+            return event[1]
+
+
+# ------------------------------
+# Incremental Re-analysis
+# ------------------------------
+_ALL_SEGMENTS = set(SECTION_HEADINGS) | {"other"}
+# (resume segments, JD segments) each analysis section reads, by prompt_budget.segment name.
+# An edit outside them leaves that section's previous fields valid.
+SECTION_INPUTS = {
+    "skills": ({"skills", "experience", "projects", "certifications", "summary", "other"},
+               {"requirements", "skills", "nice_to_have", "responsibilities", "other"}),
+    "experience_education": ({"experience", "education", "skills", "certifications", "summary", "other"},
+                             {"requirements", "skills", "responsibilities", "education", "experience", "other"}),
+    "recommendations": (_ALL_SEGMENTS, _ALL_SEGMENTS - DROPPED_SECTIONS),
+    "salary": ({"experience", "education", "summary", "other"},
+               {"requirements", "responsibilities", "experience", "company", "benefits", "other"}),
+}
+
+
+def section_fingerprints(job_description, resume_text) -> dict:
+    """{analysis section: digest of just the input segments it depends on}"""
+    resume_segments, jd_segments = segment(resume_text), segment(job_description)
+    fingerprints = {}
+    for section, (resume_inputs, jd_inputs) in SECTION_INPUTS.items():
+        payload = json.dumps([[resume_segments.get(name, "") for name in sorted(resume_inputs)],
+                              [jd_segments.get(name, "") for name in sorted(jd_inputs)]])
+        fingerprints[section] = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    return fingerprints
+
+
+def analysis_snapshot(job_description, resume_text, result, model, temperature, depth, jd_profile=False,
+                      sectioned=False) -> dict:
+    """What a later `astream_analysis(previous=...)` needs to re-analyze incrementally"""
+    return {
+        "fingerprints": section_fingerprints(job_description, resume_text),
+        "result": result,
+        "model": model,
+        "temperature": temperature,
+        "depth": depth,
+        "jd_profile": bool(jd_profile),
+        "sectioned": bool(sectioned),
+    }
+
+
+def changed_sections(previous, job_description, resume_text, model, temperature, depth, jd_profile=False,
+                     sectioned=False):
+    """Sections whose inputs differ from `previous`, or None if it can't be reused at all"""
+    if (not previous or depth in LOCAL_ONLY_DEPTHS
+            or (previous["model"], previous["temperature"], previous["depth"]) != (model, temperature, depth)
+            or previous.get("jd_profile", False) != bool(jd_profile)
+            # The modes route sections to different models, so their fields don't mix
+            or previous.get("sectioned", False) != bool(sectioned)
+            or any(name not in previous["result"] for name in RESULT_FIELDS)):
+        return None
+    fingerprints = section_fingerprints(job_description, resume_text)
+    return [section for section in ANALYSIS_SECTIONS if previous["fingerprints"].get(section) != fingerprints[section]]
+
+
+async def astream_incremental(job_description, resume_text, previous, changed, model=DEFAULT_MODEL,
+                              temperature=DEFAULT_TEMPERATURE, depth=DEFAULT_DEPTH, client=None, cache=None,
+                              section_models=None, jd_profile=False, sectioned=False) -> AsyncIterator[tuple]:
+    """Reuse `previous` fields of unchanged sections and re-run only the `changed` ones.
+
+    Unless the run is `sectioned`, every re-run section uses the selected `model`
+    (DEFAULT_SECTION_MODELS only applies to the parallel-sections mode).
+    """
+    started = time.perf_counter()
+    if section_models is None and not sectioned:
+        section_models = {}
+    result = {}
+    reused = [name for section in ANALYSIS_SECTIONS if section not in changed for name in ANALYSIS_SECTIONS[section]]
+    for name in reused:
+        result[name] = previous["result"][name]
+        yield ("field", name, result[name])
+    if "skills" in changed:
+        # Lexical skill sets are free - show them now, the LLM's skills section replaces them
+        local = local_analysis(job_description, resume_text)
+        for name in ANALYSIS_SECTIONS["skills"]:
+            yield ("field", name, local[name])
+
+    raw_outputs = {}
+    async for section, run in aiter_sections(job_description, resume_text, model, temperature, depth,
+                                             client=client, cache=cache, section_models=section_models,
+                                             sections=changed, jd_profile=jd_profile):
+        for key, value in run.result.items():
+            result[key] = value
+            yield ("field", key, value)
+        raw_outputs[section] = run.raw_output
+    ordered = {field_name: result[field_name] for field_name in RESULT_FIELDS}
+    yield ("done", AnalysisRun(ordered, json.dumps(raw_outputs, indent=2) if raw_outputs else "",
+                               elapsed=time.perf_counter() - started, reused_fields=reused))
+
+
+# ------------------------------
+# Streaming Analysis
+# ------------------------------
+async def astream_analysis(job_description, resume_text, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                           depth=DEFAULT_DEPTH, client=None, cache=None, sectioned=False,
+                           previous=None, jd_profile=False) -> AsyncIterator[tuple]:
+    """Yield ("field", key, value) as each ResumeAnalysisResult field completes, then ("done", AnalysisRun).
+
+    `previous` is an `analysis_snapshot` of the last run; when only some sections'
+    inputs changed since then, just those sections are re-analyzed.
+    """
+    if model == AUTO_MODEL and depth not in LOCAL_ONLY_DEPTHS:
+        client = client or get_client()
+        # Stick with the previous run's model when it's still a good pick, so its fields stay reusable
+        routed = await aroute_model(job_description, resume_text, depth, client,
+                                    prefer=previous["model"] if previous else None)
+        async for event in astream_analysis(job_description, resume_text, routed, temperature, depth, client=client,
+                                            cache=cache, sectioned=sectioned, previous=previous,
+                                            jd_profile=jd_profile):
+            yield ("done", replace(event[1], routed_model=routed)) if event[0] == "done" else event
+        return
+    started = time.perf_counter()
+    run = None
+    changed = changed_sections(previous, job_description, resume_text, model, temperature, depth, jd_profile,
+                               sectioned)
+    if changed is not None and len(changed) < len(ANALYSIS_SECTIONS):
+        async for event in astream_incremental(job_description, resume_text, previous, changed, model, temperature,
+                                               depth, client=client, cache=cache, jd_profile=jd_profile,
+                                               sectioned=sectioned):
+            yield event
+        return
+    if sectioned and depth not in LOCAL_ONLY_DEPTHS:
+        async for event in astream_sections(job_description, resume_text, model, temperature, depth,
+                                            client=client, cache=cache, jd_profile=jd_profile):
+            yield event
+        return
+    client = client or get_client()
+    profile = await _profile_for(job_description, depth, jd_profile, client, cache)
+    cache = _analysis_cache(cache, profile)
+    cache_key = _cache_key(job_description, resume_text, model, temperature, depth, profile)
+    if depth in LOCAL_ONLY_DEPTHS:
+        run = await aanalyze(job_description, resume_text, model, temperature, depth)
+    elif cache is not None:
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            run = AnalysisRun(cached, "", cached=True, elapsed=time.perf_counter() - started)
+    if run is None:
+        # Same key as `aanalyze`, so identical streamed and non-streamed requests coalesce too
+        leader, shared = await client.flights.join(cache_key)
+        if not leader:
+            run = replace(shared, coalesced=True)
+    if run is not None:
+        for key, value in run.result.items():
+            yield ("field", key, value)
+        yield ("done", run)
+        return
+
+    try:
+        parser = IncrementalObjectParser()
+        chunks = []
+        async for chunk in client.astream(build_messages(job_description, resume_text, depth, model, profile),
+                                          model, temperature):
+            chunks.append(chunk)
+            if parser is None:
+                continue
+            try:
+                # Coerced like the final result, so "72%" or a JSON list previews the same as it ends up
+                for key, value in coerce_fields(dict(parser.feed(chunk)), FIELD_TYPES).items():
+                    yield ("field", key, value)
+            except ValueError:
+                # Malformed stream: stop rendering incrementally and leave it to the final parse
+                parser = None
+
+        run = await afinalize_output("".join(chunks), RESULT_FIELDS, job_description, resume_text, model,
+                                     temperature, depth, client, profile)
+        if cache is not None and not run.defaulted_fields:
+            await asyncio.to_thread(cache.set, cache_key, run.result)
+        run.elapsed = time.perf_counter() - started
+    except BaseException as exc:
+        client.flights.fail(cache_key, exc)
+        raise
+    client.flights.resolve(cache_key, run)
+    # Fields that only appeared after repair / re-ask haven't been rendered yet
+    for key in run.reasked_fields + run.defaulted_fields:
+        yield ("field", key, run.result[key])
+    yield ("done", run)
+
+
+def stream_analysis(job_description, resume_text, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                    depth=DEFAULT_DEPTH, client=None, cache=None, sectioned=False, previous=None,
+                    jd_profile=False) -> Iterator[tuple]:
+    """Blocking iterator over `astream_analysis` for the Streamlit script thread"""
+    client = client or get_client()
+    return iterate_on_client(client, astream_analysis(job_description, resume_text, model, temperature, depth,
+                                                      client=client, cache=cache, sectioned=sectioned,
+                                                      previous=previous, jd_profile=jd_profile))
+
+
+# ------------------------------
+# Batch Matching
+# ------------------------------
+def _as_items(docs):
+    if isinstance(docs, dict):
+        return list(docs.items())
+    return [doc if isinstance(doc, tuple) else (str(i), doc) for i, doc in enumerate(docs)]
+
+
+def _read(doc) -> str:
+    """Batch documents are text or anything with `read_text()` (e.g. an ingest.IngestedDocument)"""
+    return doc if isinstance(doc, str) else doc.read_text()
+
+
+async def amatch_batch(resumes, jds, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, depth=DEFAULT_DEPTH,
+                       max_concurrency=8, client=None, cache=None, sectioned=False,
+                       top_k=None, jd_profile=False) -> AsyncIterator[dict]:
+    """Analyze every resume against every JD, yielding result records as they complete.
+
+    `resumes` and `jds` are dicts of id -> text or sequences of (id, text) / text.
+    Documents with a `read_text()` method (spilled ingest documents) are only
+    read when one of their pairs is analyzed, so memory doesn't grow with the batch.
+    With `top_k`, resumes are first pre-ranked locally (BM25) and only the best
+    `top_k` per JD get the full LLM analysis. With `jd_profile` each JD is
+    condensed once and every resume is scored against that profile.
+    At most `max_concurrency` pairs are scheduled at once; the client's token
+    buckets keep calls within the model's RPM/TPM budget and retry 429/5xx.
+    Failures are yielded as records with an "error" key.
+    """
+    client = client or get_client()
+    resume_items = _as_items(resumes)
+    jd_items = _as_items(jds)
+    if top_k:
+        from prerank import shortlist  # NumPy is only needed for shortlisting runs
+
+        def rank():
+            # The BM25 index needs every text at once; they are dropped again once ranked
+            return shortlist([(doc_id, _read(doc)) for doc_id, doc in resume_items],
+                             [(doc_id, _read(doc)) for doc_id, doc in jd_items], top_k)
+
+        resume_docs = dict(resume_items)
+        ranked = await asyncio.to_thread(rank)
+        pairs = ((jd_id, jd_doc, resume_id, resume_docs[resume_id], score)
+                 for jd_id, jd_doc in jd_items for resume_id, score in ranked[jd_id])
+    else:
+        pairs = ((jd_id, jd_doc, resume_id, resume_doc, None)
+                 for jd_id, jd_doc in jd_items for resume_id, resume_doc in resume_items)
+
+    async def run(jd_id, jd_doc, resume_id, resume_doc, prerank_score):
+        record = {"jd_id": jd_id, "resume_id": resume_id, "model": model, "depth": depth}
+        if prerank_score is not None:
+            record["prerank_score"] = round(prerank_score, 4)
+        try:
+            jd_text, resume_text = await asyncio.to_thread(lambda: (_read(jd_doc), _read(resume_doc)))
+            run_ = await aanalyze(jd_text, resume_text, model, temperature, depth, client=client, cache=cache,
+                                  sectioned=sectioned, jd_profile=jd_profile)
+            record.update(model=run_.routed_model or model, result=run_.result, cached=run_.cached,
+                          elapsed=round(run_.elapsed, 3))
+        except AnalysisParseError as e:
+            record.update(error=f"parse error: {e}", raw_output=e.raw_output)
+        except Exception as e:
+            record.update(error=str(e))
+        return record
+
+    in_flight = set()
+    for pair in pairs:
+        # Keep scheduling bounded so huge batches don't create every task up front
+        if len(in_flight) >= max_concurrency:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+        in_flight.add(asyncio.ensure_future(run(*pair)))
+    for task in asyncio.as_completed(in_flight):
+        yield await task
+
+
+def match_batch(resumes, jds, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, depth=DEFAULT_DEPTH,
+                max_concurrency=8, client=None, cache=None, sectioned=False, top_k=None,
+                jd_profile=False) -> Iterator[dict]:
+    """Synchronous generator over `amatch_batch`, run on the client's event loop"""
+    client = client or get_client()
+    yield from iterate_on_client(client, amatch_batch(resumes, jds, model, temperature, depth,
+                                                      max_concurrency=max_concurrency, client=client, cache=cache,
+                                                      sectioned=sectioned, top_k=top_k, jd_profile=jd_profile))
@@ -0,0 +1,192 @@
+# fake_groq.py
+"""Local stand-in for the Groq chat completions API.
+
+Serves POST /openai/v1/chat/completions (plain or `stream: true` SSE) with a canned
+ResumeAnalysisResult or replayed recorded responses, and can inject latency, 429s,
+5xx errors and truncated JSON. Point the app at it with:
+    python fake_groq.py --port 8787 --error-rate 0.2
+    GROQ_API_BASE=http://127.0.0.1:8787 GROQ_API_KEY=fake streamlit run model.py
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_RESULT = {
+    "skills_matched": "Python, SQL, Docker",
+    "skills_missing": "Kubernetes, Terraform",
+    "skills_extra": "React, Figma",
+    "experience_match": "4 years of relevant backend experience against 3+ required",
+    "education_match": "B.Sc. Computer Science meets the degree requirement",
+    "overall_match_percentage": 72,
+    "selection_probability": "Medium",
+    "strength_areas": "API design, Data modelling, Mentoring",
+    "improvement_areas": "Cloud infrastructure, Container orchestration, Observability",
+    "specific_recommendations": "Add a Kubernetes project, Quantify backend impact, Mention CI/CD ownership",
+    "interview_preparation": "System design, SQL optimisation, Incident handling",
+    "salary_competitiveness": "Mid-market; strengthen with infrastructure skills",
+}
+
+
+STREAM_CHUNK_CHARS = 16
+
+
+def load_responses(path) -> list:
+    """Recorded completions, one per line: a JSON string or an object with a "content" key"""
+    responses = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                value = json.loads(line)
+                responses.append(value["content"] if isinstance(value, dict) else value)
+    return responses
+
+
+class FakeGroqConfig:
+    def __init__(self, latency=0.05, jitter=0.0, tokens_per_second=0.0, error_rate=0.0,
+                 server_error_rate=0.0, retry_after=0.1, responses=None, malformed_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.server_error_rate = server_error_rate
+        self.retry_after = retry_after
+        self.responses = list(responses or [])
+        self.malformed_rate = malformed_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def next_content(self) -> str:
+        with self.lock:
+            self.requests += 1
+            if self.responses:
+                content = self.responses[(self.requests - 1) % len(self.responses)]
+            else:
+                content = json.dumps(CANNED_RESULT)
+        if random.random() < self.malformed_rate:
+            # Cut the JSON off mid-object, like a completion that hit max_tokens
+            content = content[:int(len(content) * 0.6)]
+        return content
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                return self._send(404, {"error": {"message": "not found"}})
+
+            roll = random.random()
+            if roll < config.error_rate:
+                return self._send(429, {"error": {"message": "rate limit exceeded", "type": "tokens"}},
+                                  {"retry-after": str(config.retry_after)})
+            if roll < config.error_rate + config.server_error_rate:
+                return self._send(503, {"error": {"message": "service unavailable"}})
+
+            content = config.next_content()
+            prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+            completion_tokens = max(1, len(content) // 4)
+            usage = {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_chars // 4 + completion_tokens,
+            }
+            # Time to first token; generation time is added per chunk when streaming
+            time.sleep(config.latency + random.uniform(0, config.jitter))
+            if request.get("stream"):
+                return self._stream(request, content, usage)
+            if config.tokens_per_second:
+                time.sleep(completion_tokens / config.tokens_per_second)
+
+            self._send(200, {
+                "id": f"chatcmpl-fake-{config.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        def _stream(self, request, content, usage):
+            """Server-sent events with chunked transfer encoding, usage in the final chunk"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            base = {"id": f"chatcmpl-fake-{config.requests}", "object": "chat.completion.chunk",
+                    "created": int(time.time()), "model": request.get("model", "fake")}
+
+            def event(data):
+                payload = f"data: {data}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+                self.wfile.flush()
+
+            for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                piece = content[start:start + STREAM_CHUNK_CHARS]
+                if config.tokens_per_second:
+                    time.sleep(max(1, len(piece) // 4) / config.tokens_per_second)
+                event(json.dumps({**base, "choices": [
+                    {"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}
+                ]}))
+            event(json.dumps({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                              "x_groq": {"usage": usage}}))
+            event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    """Start the fake server on a background thread; returns (server, base_url)"""
+    config = config or FakeGroqConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-groq", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Groq API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.05, help="Base seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Simulated generation speed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="Fraction answered with 503")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction answered with truncated JSON")
+    parser.add_argument("--responses", help="JSONL of recorded completions to replay instead of the canned one")
+    args = parser.parse_args()
+
+    config = FakeGroqConfig(args.latency, args.jitter, args.tokens_per_second, args.error_rate, args.server_error_rate,
+                            responses=load_responses(args.responses) if args.responses else None,
+                            malformed_rate=args.malformed_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f"fake Groq listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# ingest.py
+"""Streaming, bounded-memory ingestion of resume PDFs and zip archives of them.
+
+Archives are read entry by entry. Each file is spooled (to disk past
+SPOOL_MEMORY_BYTES) under a byte limit, its pages are extracted one at a time
+and the text is spilled to a file in the spill directory, so memory stays flat
+however many documents a batch holds.
+
+    with Ingestor() as ingestor:
+        for doc in ingestor.iter_path("resumes.zip"):
+            text = doc.read_text() if not doc.error else None
+        print(ingestor.stats.as_dict())
+"""
+import io
+import os
+import time
+import shutil
+import zipfile
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import Iterator
+
+from pypdf import PdfReader
+
+from metrics import get_metrics
+
+# ------------------------------
+# Config / Limits
+# ------------------------------
+MAX_FILE_BYTES = int(os.environ.get("INGEST_MAX_FILE_BYTES", 20 * 1024 * 1024))
+MAX_PAGES = int(os.environ.get("INGEST_MAX_PAGES", 50))
+MAX_ARCHIVE_ENTRIES = int(os.environ.get("INGEST_MAX_ARCHIVE_ENTRIES", 5000))
+SPILL_DIR = os.environ.get("INGEST_SPILL_DIR", "")  # parent of the per-run spill directories; empty = system temp
+MAX_COMPRESSION_RATIO = 100  # an entry inflating more than this is treated as a zip bomb
+SPOOL_MEMORY_BYTES = 1024 * 1024
+COPY_CHUNK_BYTES = 64 * 1024
+TEXT_EXTENSIONS = {".txt", ".md"}
+DOCUMENT_EXTENSIONS = TEXT_EXTENSIONS | {".pdf"}
+
+
+class IngestLimitError(ValueError):
+    """A file is over the per-file byte or page limit"""
+
+
+@dataclass
+class IngestedDocument:
+    name: str
+    text_path: str = ""  # spilled text; empty when the file was rejected
+    pages: int = 0
+    bytes: int = 0
+    error: str = ""
+
+    def read_text(self) -> str:
+        if not self.text_path:
+            return ""
+        with open(self.text_path, encoding="utf-8") as fh:
+            return fh.read()
+
+
+@dataclass
+class IngestStats:
+    documents: int = 0
+    rejected: int = 0
+    pages: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "seconds": round(self.seconds, 3), "pages_per_sec": round(self.pages_per_sec, 1)}
+
+
+# ------------------------------
+# Streaming primitives
+# ------------------------------
+def spool(stream, max_bytes=MAX_FILE_BYTES):
+    """Copy a binary stream into a seekable temp file in chunks, failing past `max_bytes`"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    size = 0
+    try:
+        while chunk := stream.read(COPY_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise IngestLimitError(f"larger than {max_bytes} bytes")
+            spooled.write(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+def iter_pdf_pages(source, max_pages=MAX_PAGES) -> Iterator[str]:
+    """Text of each page in turn from a path or seekable binary file"""
+    reader = PdfReader(source)
+    if len(reader.pages) > max_pages:
+        raise IngestLimitError(f"{len(reader.pages)} pages (limit {max_pages})")
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+# ------------------------------
+# Ingestor
+# ------------------------------
+class Ingestor:
+    """Turns uploads, files, directories and zip archives into spilled text documents.
+
+    Spill files live in a temporary directory removed by `close()` unless an
+    explicit `spill_dir` is given. `stats` accumulates throughput over the run.
+    """
+
+    def __init__(self, spill_dir=None, max_file_bytes=MAX_FILE_BYTES, max_pages=MAX_PAGES,
+                 max_entries=MAX_ARCHIVE_ENTRIES):
+        self._tmp = None if spill_dir else tempfile.TemporaryDirectory(prefix="ingest-", dir=SPILL_DIR or None)
+        self.spill_dir = spill_dir or self._tmp.name
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self.max_file_bytes = max_file_bytes
+        self.max_pages = max_pages
+        self.max_entries = max_entries
+        self.stats = IngestStats()
+        self._count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+    def _spill_path(self) -> str:
+        self._count += 1
+        return os.path.join(self.spill_dir, f"{self._count:06d}.txt")
+
+    def _write_text(self, name, source, path) -> int:
+        """Spill a PDF's pages (or a text file) to `path`; returns the page count"""
+        pages = 0
+        with open(path, "w", encoding="utf-8") as out:
+            if os.path.splitext(name)[1].lower() in TEXT_EXTENSIONS:
+                shutil.copyfileobj(io.TextIOWrapper(source, encoding="utf-8", errors="replace"), out,
+                                   COPY_CHUNK_BYTES)
+                return 1
+            for text in iter_pdf_pages(source, self.max_pages):
+                pages += 1
+                if text:
+                    out.write(text + "\n")
+        return pages
+
+    def ingest_file(self, name, stream, size=None) -> IngestedDocument:
+        """Spool one file-like upload and spill its text; limit violations end up in `error`"""
+        doc = IngestedDocument(name)
+        started = time.perf_counter()
+        with get_metrics().span("ingest_document") as span:
+            try:
+                if size is not None and size > self.max_file_bytes:
+                    raise IngestLimitError(f"larger than {self.max_file_bytes} bytes")
+                with spool(stream, self.max_file_bytes) as spooled:
+                    doc.bytes = spooled.seek(0, os.SEEK_END)
+                    spooled.seek(0)
+                    path = self._spill_path()
+                    try:
+                        doc.pages = self._write_text(name, spooled, path)
+                    except BaseException:
+                        os.remove(path)
+                        raise
+                doc.text_path = path
+            except Exception as e:
+                # Malformed PDFs raise all sorts (KeyError, TypeError, AssertionError...) - skip just this file
+                doc.error = str(e) if isinstance(e, IngestLimitError) else f"{type(e).__name__}: {e}"
+            span.update(pages=doc.pages, bytes=doc.bytes, rejected=bool(doc.error))
+        self.stats.seconds += time.perf_counter() - started
+        self.stats.bytes += doc.bytes
+        if doc.error:
+            self.stats.rejected += 1
+        else:
+            self.stats.documents += 1
+            self.stats.pages += doc.pages
+        return doc
+
+    def iter_archive(self, source) -> Iterator[IngestedDocument]:
+        """Ingest every PDF / text entry of a zip archive (path or seekable file), one at a time"""
+        with zipfile.ZipFile(source) as archive:
+            entries = [info for info in archive.infolist()
+                       if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+                       and os.path.splitext(info.filename)[1].lower() in DOCUMENT_EXTENSIONS]
+            if len(entries) > self.max_entries:
+                raise IngestLimitError(f"archive has {len(entries)} documents (limit {self.max_entries})")
+            for info in entries:
+                if info.file_size > MAX_COMPRESSION_RATIO * max(info.compress_size, 1):
+                    self.stats.rejected += 1
+                    yield IngestedDocument(info.filename, error="suspicious compression ratio")
+                    continue
+                with archive.open(info) as stream:
+                    yield self.ingest_file(info.filename, stream, size=info.file_size)
+
+    def iter_path(self, path) -> Iterator[IngestedDocument]:
+        """A zip archive, a single document, or every document in a directory (sorted by name)"""
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                child = os.path.join(path, name)
+                if os.path.isfile(child) and os.path.splitext(name)[1].lower() in DOCUMENT_EXTENSIONS | {".zip"}:
+                    yield from self.iter_path(child)
+        elif zipfile.is_zipfile(path):
+            yield from self.iter_archive(path)
+        else:
+            with open(path, "rb") as fh:
+                yield self.ingest_file(os.path.basename(path), fh, size=os.path.getsize(path))
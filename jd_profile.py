@@ -0,0 +1,230 @@
+# jd_profile.py
+import os
+import re
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field
+
+from json_repair import fill_defaults, repair_json
+from metrics import get_metrics
+from prompt_budget import JD_PRIORITY, pack_sections, segment
+from result_cache import make_cache_key
+from skill_matcher import get_skill_index
+
+# ------------------------------
+# Config
+# ------------------------------
+# Extracted once per JD and reused for every candidate, so a strong model is affordable
+PROFILE_MODEL = os.environ.get("JD_PROFILE_MODEL", "llama-3.3-70b-versatile")
+PROFILE_TEMPERATURE = 0.0
+PROFILE_JD_BUDGET = 3000  # tokens of the raw JD the extraction call may see
+MEMORY_CACHE_SIZE = int(os.environ.get("JD_PROFILE_CACHE_SIZE", 128))
+
+
+# ------------------------------
+# Profile schema / prompt
+# ------------------------------
+class JobProfile(BaseModel):
+    title: str = Field(description="Job title")
+    seniority: str = Field(description="Seniority level, e.g. Junior, Mid, Senior, Lead")
+    required_skills: str = Field(description="Comma-separated must-have skills, tools and technologies")
+    nice_to_have_skills: str = Field(description="Comma-separated preferred / bonus skills")
+    min_years_experience: int = Field(description="Minimum years of relevant experience (0 if not stated)")
+    education: str = Field(description="Required or preferred degrees and certifications")
+    key_responsibilities: str = Field(description="Comma-separated main responsibilities, a few words each")
+    domain: str = Field(description="Industry, product and team context in a few words")
+    compensation: str = Field(description="Stated salary range, benefits and location, or Not stated")
+
+
+PROFILE_FIELDS = {name: int if info.annotation is int else str for name, info in JobProfile.model_fields.items()}
+
+profile_format_instructions = "A single JSON object with exactly these keys:\n" + "\n".join(
+    f'"{name}": {"integer" if info.annotation is int else "string"} - {info.description}'
+    for name, info in JobProfile.model_fields.items()
+)
+
+PROFILE_SYSTEM_PROMPT = """You are a senior technical recruiter.
+CRITICAL: For all list fields, return comma-separated strings, NOT JSON arrays.
+Return only valid JSON following the exact schema provided."""
+
+prompt_profile = PromptTemplate(
+    input_variables=["job_description", "format_instructions"],
+    template="""
+Condense this job description into a compact hiring profile. The profile replaces the
+full text when screening many resumes, so keep every requirement that matters for
+matching (skills, experience, education, seniority) and drop everything else.
+
+Return the profile following this exact format:
+{format_instructions}
+
+Job Description:
+{job_description}
+"""
+)
+
+PROFILE_FINGERPRINT = PROFILE_SYSTEM_PROMPT + prompt_profile.template + profile_format_instructions
+# First line of the profile as it appears in analysis prompts, in place of the raw JD
+PROFILE_HEADER = "Pre-analyzed job profile (stands in for the full job description):"
+
+_YEARS_RE = re.compile(r"(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?years?", re.IGNORECASE)
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+# ------------------------------
+# Building / rendering
+# ------------------------------
+def _mentioned(skill, text) -> bool:
+    return skill.lower() in text.lower()
+
+
+def _flat(text, limit) -> str:
+    """A JD section's bullet lines as one short comma-separated line"""
+    items = [line.strip("-•* ") for line in text.splitlines() if line.strip("-•* ")]
+    return ", ".join(items)[:limit] or "Not stated"
+
+
+def local_profile(job_description) -> dict:
+    """Lexical profile from the JD sections - the fallback when the extraction call fails.
+
+    Marked with source "local" so it is never remembered, persisted or used to cache analyses.
+    """
+    sections = segment(job_description)
+    index = get_skill_index()
+    required = index.extract("\n".join(sections.get(name, "") for name in ("requirements", "skills", "other")))
+    preferred = [skill for skill in index.extract(sections.get("nice_to_have", "")) if skill not in required]
+    years = [int(match) for match in _YEARS_RE.findall(job_description)]
+    first_line = next((line for line in job_description.splitlines() if line.strip()), "")
+    responsibilities = sections.get("responsibilities", "").splitlines()[:5]
+    return {
+        "title": first_line.strip()[:80],
+        "seniority": "Not stated",
+        "required_skills": ", ".join(required),
+        "nice_to_have_skills": ", ".join(preferred),
+        "min_years_experience": min(years) if years else 0,
+        "education": _flat(sections.get("education", ""), 200),
+        "key_responsibilities": _flat("\n".join(responsibilities), 300),
+        "domain": _flat(sections.get("company", ""), 150),
+        "compensation": _flat(sections.get("benefits", ""), 150),
+        "source": "local",
+    }
+
+
+def with_lexical_skills(profile, job_description) -> dict:
+    """Append skills the lexical matcher finds in the JD but the profile left out"""
+    lexical = local_profile(job_description)
+    listed = profile["required_skills"] + " " + profile["nice_to_have_skills"]
+    merged = dict(profile)
+    for name in ("required_skills", "nice_to_have_skills"):
+        extra = [skill for skill in lexical[name].split(", ") if skill and not _mentioned(skill, listed)]
+        if extra:
+            merged[name] = ", ".join(part for part in [profile[name]] + extra if part)
+    return merged
+
+
+def format_profile(profile) -> str:
+    """The profile as the compact text analysis prompts use instead of the raw JD"""
+    lines = [PROFILE_HEADER]
+    for name in PROFILE_FIELDS:
+        value = profile.get(name)
+        if name == "min_years_experience":
+            value = f"{value}+ years" if value else "Not stated"
+        if value:
+            lines.append(f"{name.replace('_', ' ').capitalize()}: {value}")
+    return "\n".join(lines)
+
+
+def is_fallback(profile) -> bool:
+    return bool(profile) and profile.get("source") == "local"
+
+
+def profile_fingerprint(profile) -> str:
+    """Cache-key fingerprint of analyses prompted with `profile`: the profile prompt plus its rendered text"""
+    digest = hashlib.sha256(format_profile(profile).encode("utf-8")).hexdigest()[:16]
+    return f"{PROFILE_FINGERPRINT}:{digest}"
+
+
+def profile_key(job_description) -> str:
+    return make_cache_key(job_description, "", PROFILE_MODEL, PROFILE_TEMPERATURE, "jd_profile",
+                          prompt_fingerprint=PROFILE_FINGERPRINT)
+
+
+def build_profile_messages(job_description):
+    jd_text, _ = pack_sections(job_description, PROFILE_JD_BUDGET, JD_PRIORITY)
+    human_msg = HumanMessage(content=prompt_profile.format(
+        job_description=jd_text, format_instructions=profile_format_instructions
+    ))
+    return [SystemMessage(content=PROFILE_SYSTEM_PROMPT), human_msg]
+
+
+# ------------------------------
+# Cached extraction
+# ------------------------------
+def _remember(key, profile):
+    with _memory_lock:
+        _memory_cache[key] = profile
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+async def _extract(job_description, client, cache, key) -> dict:
+    """The LLM-condensed profile, or the lexical fallback when nothing usable comes back"""
+    with get_metrics().span("jd_profile", PROFILE_MODEL) as span:
+        try:
+            response = await client.ainvoke(build_profile_messages(job_description), PROFILE_MODEL,
+                                            PROFILE_TEMPERATURE)
+            fields, missing = repair_json(response.content, PROFILE_FIELDS)
+        except Exception as e:
+            fields, missing = {}, list(PROFILE_FIELDS)
+            span["error"] = type(e).__name__
+        if not fields.get("required_skills"):
+            span["source"] = "local"
+            return local_profile(job_description)
+        span["source"] = "llm"
+        profile = with_lexical_skills(fill_defaults(fields, PROFILE_FIELDS), job_description)
+        if cache is not None and not missing:
+            await asyncio.to_thread(cache.set, key, profile)
+        return profile
+
+
+async def aget_jd_profile(job_description, client, cache=None) -> dict:
+    """The JD's profile: memory, then the analysis cache, then one extraction call.
+
+    Concurrent requests for the same JD (e.g. a batch fanning out over many
+    resumes) share a single in-flight extraction.
+    """
+    key = profile_key(job_description)
+    with _memory_lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+    if cache is not None:
+        profile = await asyncio.to_thread(cache.get, key)
+        if profile is not None:
+            _remember(key, profile)
+            return profile
+
+    leader, shared = await client.flights.join(key)
+    if not leader:
+        return shared
+    try:
+        profile = await _extract(job_description, client, cache, key)
+    except BaseException as exc:
+        client.flights.fail(key, exc)
+        raise
+    client.flights.resolve(key, profile)
+    # A fallback stands in for this request only; the next one retries the extraction
+    if not is_fallback(profile):
+        _remember(key, profile)
+    return profile
+
+
+def clear_memory_cache():
+    with _memory_lock:
+        _memory_cache.clear()
@@ -0,0 +1,294 @@
+# job_queue.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from asyncio import CancelledError
+
+from engine import AnalysisParseError, stream_analysis
+from metrics import get_metrics
+
+# ------------------------------
+# Config
+# ------------------------------
+DEFAULT_QUEUE_PATH = os.environ.get("JOB_QUEUE_PATH", os.path.join(".cache", "jobs.sqlite3"))
+DEFAULT_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", 24 * 3600))
+# A running job whose heartbeat is older than this was orphaned by a dead worker
+JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", 300))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 2))
+# Running jobs are touched this often regardless of progress, so a slow but healthy job never looks stale
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", min(30, JOB_STALE_SECONDS / 4)))
+PURGE_INTERVAL_SECONDS = 3600
+IDLE_POLL_SECONDS = 1.0
+
+PENDING_STATUSES = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    fields TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    raw_output TEXT,
+    error TEXT,
+    meta TEXT NOT NULL DEFAULT '{}',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+"""
+
+_JSON_COLUMNS = ("params", "fields", "result", "meta")
+
+
+class JobQueue:
+    """SQLite-backed queue of analysis jobs drained by a pool of worker threads.
+
+    Jobs persist their inputs, streamed partial fields and final result, so the UI
+    can poll a job by id from any rerun, session or browser refresh. Workers only
+    drive `stream_analysis`; the LLM calls themselves run on the shared client loop.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, workers=DEFAULT_WORKERS, client=None, cache=None,
+                 on_complete=None):
+        self.path = path
+        self.client = client
+        self.cache = cache
+        self.on_complete = on_complete
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._running = {}  # job id -> attempt, for jobs this process is executing
+        self._running_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        self._threads.append(threading.Thread(target=self._maintain, name="job-maintenance", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # ------------------------------
+    # Public API
+    # ------------------------------
+    def submit(self, job_description, resume_text, model, temperature, depth, sectioned=False,
+               resume_name=None, previous=None, jd_profile=False) -> str:
+        """Queue an analysis and return its job id immediately.
+
+        `previous` is an engine.analysis_snapshot to re-analyze incrementally against.
+        """
+        job_id = uuid.uuid4().hex
+        params = {
+            "job_description": job_description,
+            "resume_text": resume_text,
+            "model": model,
+            "temperature": temperature,
+            "depth": depth,
+            "sectioned": sectioned,
+            "resume_name": resume_name,
+            "previous": previous,
+            "jd_profile": jd_profile,
+        }
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, params, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(params, ensure_ascii=False), now, now),
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """The job as a dict (JSON columns decoded), or None if unknown / expired"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for column in _JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] else None
+        return job
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")}
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    # ------------------------------
+    # Workers
+    # ------------------------------
+    def _requeue_stale(self, conn):
+        """Hand jobs orphaned by a crashed worker back to the queue (or fail them)"""
+        cutoff = time.time() - JOB_STALE_SECONDS
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'worker lost', finished_at = ? "
+            "WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+            (time.time(), cutoff, JOB_MAX_ATTEMPTS),
+        )
+        conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running' AND updated_at < ?", (cutoff,))
+
+    def _purge(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - JOB_RETENTION_SECONDS,))
+
+    def _heartbeat(self):
+        """Refresh updated_at of every job this process still owns"""
+        with self._running_lock:
+            running = list(self._running.items())
+        if not running:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running' AND attempts = ?",
+                [(now, job_id, attempt) for job_id, attempt in running],
+            )
+
+    def _maintain(self):
+        """Heartbeats on a timer, independent of analysis progress, plus the periodic retention purge"""
+        next_purge = time.monotonic()
+        while True:
+            try:
+                self._heartbeat()
+                if time.monotonic() >= next_purge:
+                    self._purge()
+                    next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+            except sqlite3.Error:
+                pass  # e.g. the database is locked - retried on the next tick
+            if self._stop.wait(JOB_HEARTBEAT_SECONDS):
+                return
+
+    def _claim(self):
+        """Atomically move the oldest queued job to running; (id, params, attempt) or None if the queue is empty"""
+        with self._lock, self._connect() as conn:
+            self._requeue_stale(conn)
+            while True:
+                row = conn.execute(
+                    "SELECT id, params, created_at FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                # The status guard keeps this safe against other processes sharing the file
+                claimed = conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, updated_at = ? "
+                    "WHERE id = ? AND status = 'queued'",
+                    (now, now, row[0]),
+                ).rowcount
+                if claimed:
+                    get_metrics().observe("job_queue_wait", now - row[2])
+                    attempt = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (row[0],)).fetchone()[0]
+                    return row[0], json.loads(row[1]), attempt
+
+    def _update(self, job_id, attempt=None, **columns) -> bool:
+        """Write columns; with `attempt`, only while that attempt still owns the running job"""
+        columns["updated_at"] = time.time()
+        for column in _JSON_COLUMNS:
+            if column in columns:
+                columns[column] = json.dumps(columns[column], ensure_ascii=False)
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        where, args = "id = ?", [job_id]
+        if attempt is not None:
+            # A job requeued or failed as stale belongs to someone else now; don't overwrite it
+            where += " AND status = 'running' AND attempts = ?"
+            args.append(attempt)
+        with self._connect() as conn:
+            return conn.execute(f"UPDATE jobs SET {assignments} WHERE {where}", (*columns.values(), *args)).rowcount > 0
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self._claim()
+                if claimed is None:
+                    self._wakeup.wait(IDLE_POLL_SECONDS)
+                    self._wakeup.clear()
+                    continue
+                self._run(*claimed)
+            except Exception:
+                # e.g. the database is locked; keep the worker alive. A job left half-written
+                # stops getting heartbeats and is requeued as stale.
+                self._stop.wait(IDLE_POLL_SECONDS)
+
+    def _run(self, job_id, params, attempt):
+        with self._running_lock:
+            self._running[job_id] = attempt
+        try:
+            with get_metrics().span("job", params["model"], depth=params["depth"], sectioned=params["sectioned"]):
+                self._execute(job_id, params, attempt)
+        finally:
+            with self._running_lock:
+                self._running.pop(job_id, None)
+
+    def _execute(self, job_id, params, attempt):
+        fields = {}
+        try:
+            run = None
+            for event in stream_analysis(
+                params["job_description"],
+                params["resume_text"],
+                model=params["model"],
+                temperature=params["temperature"],
+                depth=params["depth"],
+                client=self.client,
+                cache=self.cache,
+                sectioned=params["sectioned"],
+                previous=params.get("previous"),
+                jd_profile=params.get("jd_profile", False),
+            ):
+                if event[0] == "done":
+                    run = event[1]
+                    continue
+                _, name, value = event
+                fields[name] = value
+                self._update(job_id, attempt, fields=fields)
+            if run is None:
+                # e.g. coalesced onto a leader that was cancelled
+                raise RuntimeError("analysis ended without a result")
+        except AnalysisParseError as e:
+            self._update(job_id, attempt, status="failed", error=f"Failed to parse AI response: {e}",
+                         raw_output=e.raw_output, finished_at=time.time())
+            return
+        except (Exception, CancelledError) as e:
+            self._update(job_id, attempt, status="failed", error=str(e) or type(e).__name__,
+                         finished_at=time.time())
+            return
+
+        meta = {
+            "cached": run.cached,
+            "coalesced": run.coalesced,
+            "reasked_fields": run.reasked_fields,
+            "defaulted_fields": run.defaulted_fields,
+            "reused_fields": run.reused_fields,
+            "routed_model": run.routed_model,
+            "elapsed": run.elapsed,
+        }
+        # Still ours? Otherwise another attempt owns the job and will store / report it
+        if not self._update(job_id, attempt):
+            return
+        if self.on_complete is not None:
+            try:
+                self.on_complete(params, run)
+            except Exception as e:
+                meta["on_complete_error"] = str(e)
+        self._update(job_id, attempt, status="done", fields=run.result, result=run.result,
+                     raw_output=run.raw_output, meta=meta, finished_at=time.time())
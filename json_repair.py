@@ -0,0 +1,145 @@
+# json_repair.py
+import re
+import json
+import math
+
+from partial_json import IncrementalObjectParser
+
+_THINK_RE = re.compile(r"<think>.*?(</think>|$)", re.DOTALL | re.IGNORECASE)
+_FENCE_RE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PY_LITERAL_RE = re.compile(r"(?<![\w\"])(True|False|None)(?![\w\"])")
+_PERCENT_RE = re.compile(r"-?\d+(\.\d+)?")
+
+
+# ------------------------------
+# Text cleanup
+# ------------------------------
+def strip_wrappers(raw) -> str:
+    """Remove <think> blocks and markdown code fences around the JSON"""
+    text = _THINK_RE.sub("", raw or "")
+    return _FENCE_RE.sub("", text).strip()
+
+
+def extract_object(text) -> str:
+    """The outermost {...} span, or from the first "{" to the end if it never closes"""
+    start = text.find("{")
+    if start == -1:
+        return ""
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def _close_truncated(text) -> str:
+    """Close an unterminated string and any open brackets of a truncated object"""
+    stack, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",").rstrip()
+    if text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(stack))
+
+
+def lenient_loads(text):
+    """json.loads with progressively more forgiving fixes; None if nothing parses"""
+    fixed = _TRAILING_COMMA_RE.sub(r"\1", _PY_LITERAL_RE.sub(lambda m: _PY_LITERALS[m.group(1)], text))
+    for candidate in (text, fixed):
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+def salvage_fields(text) -> dict:
+    """Recover every field that was fully generated before the JSON went bad"""
+    parser = IncrementalObjectParser()
+    try:
+        parser.feed(text)
+    except ValueError:
+        pass
+    return dict(parser.fields)
+
+
+# ------------------------------
+# Coercion
+# ------------------------------
+def coerce_fields(data, field_types) -> dict:
+    """Coerce values to the schema: lists -> comma-separated strings, "72%" -> 72"""
+    result = {}
+    for name, value in data.items():
+        if name not in field_types:
+            continue
+        if field_types[name] is int:
+            if isinstance(value, str):
+                match = _PERCENT_RE.search(value)
+                value = float(match.group()) if match else None
+            # json.loads accepts Infinity / NaN (and 1e999 parses to inf); those count as missing
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+                result[name] = max(0, min(100, int(round(value))))
+            continue
+        if isinstance(value, list):
+            value = ", ".join(str(item).strip() for item in value if str(item).strip())
+        elif isinstance(value, dict):
+            value = ", ".join(f"{key}: {item}" for key, item in value.items())
+        elif value is None:
+            continue
+        result[name] = str(value).strip()
+    return result
+
+
+def repair_json(raw, field_types) -> tuple:
+    """Best-effort local repair of an LLM JSON response.
+
+    Returns (fields, missing) where `fields` holds every recoverable field coerced
+    to `field_types` ({name: int | str}) and `missing` lists the fields still absent.
+    """
+    text = extract_object(strip_wrappers(raw))
+    data = {}
+    if text:
+        # Prefer complete fields over a truncated last value; only close brackets as a last resort
+        data = lenient_loads(text) or salvage_fields(text) or lenient_loads(_close_truncated(text)) or {}
+    fields = coerce_fields(data, field_types)
+    missing = [name for name in field_types if name not in fields]
+    return fields, missing
+
+
+def fill_defaults(fields, field_types) -> dict:
+    """Fill any still-missing fields with neutral defaults"""
+    defaults = {name: 0 if kind is int else "Not assessed" for name, kind in field_types.items()}
+    return {name: fields.get(name, defaults[name]) for name in field_types}
@@ -0,0 +1,333 @@
+# llm_client.py
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+
+import httpx
+from langchain_groq import ChatGroq
+
+from metrics import get_metrics
+from prompt_budget import count_tokens
+from rate_budget import shared_bucket
+from router import ModelRouter
+from singleflight import SingleFlight
+
+# ------------------------------
+# Per-model rate limits
+# ------------------------------
+# Requests / tokens per minute for each entry in MODEL_OPTIONS (Groq on-demand tier).
+# Override with GROQ_RATE_LIMITS='{"llama-3.1-8b-instant": {"rpm": 30, "tpm": 6000}}'.
+MODEL_LIMITS = {
+    "llama-3.1-8b-instant": {"rpm": 30, "tpm": 6000},
+    "qwen/qwen3-32b": {"rpm": 60, "tpm": 6000},
+    "llama-3.3-70b-versatile": {"rpm": 30, "tpm": 12000},
+    "openai/gpt-oss-120b": {"rpm": 30, "tpm": 8000},
+}
+DEFAULT_LIMITS = {"rpm": 30, "tpm": 6000}
+MODEL_LIMITS.update(json.loads(os.environ.get("GROQ_RATE_LIMITS", "{}")))
+
+# "" keeps the buckets in-process; "sqlite", a SQLite path or a redis:// URL shares one budget across replicas
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "")
+
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", 8))
+DEFAULT_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 5))
+OUTPUT_TOKEN_RESERVE = 1024
+HTTP_TIMEOUT_SECONDS = float(os.environ.get("LLM_HTTP_TIMEOUT", 120))
+KEEPALIVE_EXPIRY_SECONDS = 300.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(messages) -> int:
+    """Local prompt token estimate plus room for the completion"""
+    return sum(count_tokens(str(message.content)) for message in messages) + OUTPUT_TOKEN_RESERVE
+
+
+def prompt_text(messages) -> str:
+    """The messages in request order - what a provider prefix cache compares"""
+    return "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+
+def record_usage(model, usage, token_estimate, output_text):
+    """Account a finished call from its usage metadata, or a local estimate if there is none"""
+    if usage:
+        get_metrics().record_usage(model, usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+    else:
+        get_metrics().record_usage(model, token_estimate - OUTPUT_TOKEN_RESERVE, count_tokens(output_text),
+                                   estimated=True)
+
+
+# ------------------------------
+# Token bucket
+# ------------------------------
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute / 60` per second"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount) -> float:
+        """Take `amount` tokens (going into debt if needed) and return seconds to wait"""
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def headroom(self) -> float:
+        """Fraction of the bucket currently available (0.0 - 1.0)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, self.tokens) / self.capacity
+
+    def drain(self, seconds):
+        """Put the bucket `seconds` in debt (e.g. after a 429 with retry-after)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def wait_time(self, amount) -> float:
+        """Seconds until `amount` tokens would be available, without taking them"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, min(float(amount), self.capacity) - self.tokens) / self.rate
+
+
+def make_bucket(name, per_minute, backend=RATE_LIMIT_BACKEND):
+    if not backend or backend == "local":
+        return TokenBucket(per_minute)
+    return shared_bucket(backend, name, per_minute)
+
+
+class ModelRateLimiter:
+    """Separate requests-per-minute and tokens-per-minute buckets for one model.
+
+    With a shared `backend` the buckets are global across processes / replicas and
+    a 429 from Groq pauses every replica, not just the one that hit it.
+    """
+
+    def __init__(self, rpm, tpm, name="", backend=RATE_LIMIT_BACKEND):
+        self.requests = make_bucket(f"{name}:rpm", rpm, backend)
+        self.tokens = make_bucket(f"{name}:tpm", tpm, backend)
+        # Shared buckets do a little file / network I/O per call - keep it off the event loop
+        self.shared = not isinstance(self.requests, TokenBucket)
+
+    def _reserve(self, token_estimate) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(token_estimate))
+
+    async def acquire(self, token_estimate):
+        if self.shared:
+            delay = await asyncio.to_thread(self._reserve, token_estimate)
+        else:
+            delay = self._reserve(token_estimate)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _wait_estimate(self, token_estimate) -> float:
+        return max(self.requests.wait_time(1), self.tokens.wait_time(token_estimate))
+
+    async def wait_estimate(self, token_estimate) -> float:
+        """Seconds a request of `token_estimate` tokens would wait right now (nothing is reserved)"""
+        if self.shared:
+            return await asyncio.to_thread(self._wait_estimate, token_estimate)
+        return self._wait_estimate(token_estimate)
+
+    async def penalize(self, seconds):
+        """Hold back further requests for `seconds` after the provider said to back off"""
+        if self.shared:
+            await asyncio.to_thread(self.requests.drain, seconds)
+        else:
+            self.requests.drain(seconds)
+
+
+# ------------------------------
+# Retry classification
+# ------------------------------
+def _status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None and getattr(exc, "response", None) is not None:
+        status = getattr(exc.response, "status_code", None)
+    return status
+
+
+def is_retryable(exc) -> bool:
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Connection resets / timeouts from httpx or the groq SDK carry no status
+    return type(exc).__name__ in {"APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "RemoteProtocolError"}
+
+
+def retry_after(exc):
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# ------------------------------
+# Async client
+# ------------------------------
+class AsyncLLMClient:
+    """Async ChatGroq invocation layer with a max-in-flight limit, per-model
+    RPM/TPM token buckets and jittered exponential backoff on 429/5xx.
+
+    The client owns a background event loop, so `invoke()` can be called from
+    any thread (e.g. the Streamlit script thread) and `ainvoke()` from any loop.
+    Point `base_url` (or GROQ_API_BASE) at fake_groq.py to test without Groq.
+    """
+
+    def __init__(self, api_key=None, base_url=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 max_retries=DEFAULT_MAX_RETRIES, limits=None, backoff_base=1.0, backoff_cap=30.0,
+                 rate_limit_backend=RATE_LIMIT_BACKEND):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY", "")
+        self.base_url = base_url or os.getenv("GROQ_API_BASE") or None
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.limits = limits or MODEL_LIMITS
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.rate_limit_backend = rate_limit_backend
+        self.retries = 0
+        self._llms = {}
+        self._limiters = {}
+        # Process-wide coalescing of identical analyses (used from the client loop only)
+        self.flights = SingleFlight()
+        # Per-request model choice for AUTO_MODEL, from these limiters and observed latency / parse failures
+        self.router = ModelRouter(self)
+        # One keep-alive connection pool shared by every pooled ChatGroq
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=10.0),
+            limits=httpx.Limits(max_connections=max_in_flight * 2, max_keepalive_connections=max_in_flight,
+                                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS),
+        )
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = None
+        self._thread = threading.Thread(target=self._run_loop, name="llm-client-loop", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._loop.run_forever()
+
+    def get_llm(self, model, temperature):
+        """Pooled ChatGroq per (model, temperature); SDK retries are disabled in favour of ours"""
+        key = (model, round(float(temperature), 3))
+        with self._lock:
+            if key not in self._llms:
+                kwargs = {"base_url": self.base_url} if self.base_url else {}
+                self._llms[key] = ChatGroq(api_key=self.api_key, model=model, temperature=temperature,
+                                           max_retries=0, http_async_client=self._http, **kwargs)
+            return self._llms[key]
+
+    def limiter(self, model) -> ModelRateLimiter:
+        with self._lock:
+            if model not in self._limiters:
+                limits = self.limits.get(model, DEFAULT_LIMITS)
+                self._limiters[model] = ModelRateLimiter(limits["rpm"], limits["tpm"], model,
+                                                         self.rate_limit_backend)
+            return self._limiters[model]
+
+    async def _ainvoke(self, messages, model, temperature):
+        llm = self.get_llm(model, temperature)
+        limiter = self.limiter(model)
+        token_estimate = estimate_tokens(messages)
+        get_metrics().record_prompt(model, prompt_text(messages))
+        attempt = 0
+        while True:
+            await limiter.acquire(token_estimate)
+            async with self._semaphore:
+                try:
+                    with get_metrics().span("llm_request", model, attempt=attempt):
+                        response = await llm.ainvoke(messages)
+                    record_usage(model, response.usage_metadata, token_estimate, str(response.content))
+                    return response
+                except Exception as exc:
+                    if attempt >= self.max_retries or not is_retryable(exc):
+                        raise
+                    hint = retry_after(exc)
+                    delay = max(hint or 0.0, backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+            if hint:
+                # Make every caller (and every replica, with a shared backend) honour the server's backoff
+                await limiter.penalize(hint)
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def ainvoke(self, messages, model, temperature):
+        """Invoke the model with limiting and retries; safe to await from any event loop"""
+        if asyncio.get_running_loop() is self._loop:
+            return await self._ainvoke(messages, model, temperature)
+        future = asyncio.run_coroutine_threadsafe(self._ainvoke(messages, model, temperature), self._loop)
+        return await asyncio.wrap_future(future)
+
+    async def astream(self, messages, model, temperature):
+        """Stream content chunks with limiting; retries only apply before the first chunk.
+
+        Must be iterated on the client loop (see `submit`).
+        """
+        llm = self.get_llm(model, temperature)
+        limiter = self.limiter(model)
+        token_estimate = estimate_tokens(messages)
+        get_metrics().record_prompt(model, prompt_text(messages))
+        attempt = 0
+        while True:
+            await limiter.acquire(token_estimate)
+            started = False
+            async with self._semaphore:
+                try:
+                    request_started = time.perf_counter()
+                    contents, usage = [], None
+                    async for chunk in llm.astream(messages):
+                        if not started:
+                            started = True
+                            get_metrics().observe("llm_first_token", time.perf_counter() - request_started, model)
+                        usage = chunk.usage_metadata or usage
+                        contents.append(chunk.content)
+                        yield chunk.content
+                    get_metrics().observe("llm_request", time.perf_counter() - request_started, model,
+                                          attempt=attempt, streamed=True)
+                    record_usage(model, usage, token_estimate, "".join(contents))
+                    return
+                except Exception as exc:
+                    if started or attempt >= self.max_retries or not is_retryable(exc):
+                        raise
+                    hint = retry_after(exc)
+                    delay = max(hint or 0.0, backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+            if hint:
+                # Make every caller (and every replica, with a shared backend) honour the server's backoff
+                await limiter.penalize(hint)
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def invoke(self, messages, model, temperature):
+        """Blocking wrapper around `ainvoke` for synchronous callers"""
+        return asyncio.run_coroutine_threadsafe(self._ainvoke(messages, model, temperature), self._loop).result()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the client loop and return a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def close(self):
+        self.submit(self._http.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
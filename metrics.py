@@ -0,0 +1,341 @@
+# metrics.py
+import os
+import json
+import time
+import queue
+import socket
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# ------------------------------
+# Config
+# ------------------------------
+# Per-event JSONL log, off unless a path is set; rotated to `<path>.1` once it reaches METRICS_LOG_MAX_BYTES
+METRICS_LOG_PATH = os.environ.get("METRICS_LOG_PATH", "")
+METRICS_LOG_MAX_BYTES = int(os.environ.get("METRICS_LOG_MAX_BYTES", 10 * 1024 * 1024))
+# One file per host: replicas share .cache, and every container runs as PID 1. Empty disables.
+METRICS_PROM_PATH = os.environ.get("METRICS_PROM_PATH", os.path.join(".cache", f"metrics-{socket.gethostname()}.prom"))
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 5))
+METRIC_PREFIX = "resume_matcher"
+
+# USD per million (input, output) tokens for each entry in MODEL_OPTIONS (Groq on-demand pricing).
+# Override with GROQ_PRICING='{"llama-3.1-8b-instant": [0.05, 0.08]}'.
+MODEL_PRICING = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "qwen/qwen3-32b": (0.29, 0.59),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "openai/gpt-oss-120b": (0.15, 0.75),
+}
+MODEL_PRICING.update(json.loads(os.environ.get("GROQ_PRICING", "{}")))
+
+# Histogram bucket upper bounds in seconds, from a cached PDF to a slow 70B completion
+DURATION_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RECENT_SAMPLES = 512  # per stage, for the p50 / p95 shown in the UI
+# Earlier prompts per model a new prompt's shared prefix is measured against
+PREFIX_WINDOW = int(os.environ.get("METRICS_PREFIX_WINDOW", 1000))
+# Shared prefixes are measured in blocks of this many characters (providers also cache whole blocks)
+PREFIX_BLOCK_CHARS = 64
+
+
+def percentile(samples, pct) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def token_cost(model, input_tokens, output_tokens) -> float:
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class _StageStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(DURATION_BUCKETS, seconds)] += 1
+        self.recent.append(seconds)
+
+
+class PrefixStats:
+    """How much of each prompt repeats the start of an earlier prompt to the same model.
+
+    That shared prefix is what provider-side prompt caching can reuse, so
+    `shared_ratio` (shared / total characters) estimates its hit rate locally.
+    Only chained hashes of each prompt's PREFIX_BLOCK_CHARS-sized prefix blocks
+    are kept, never the prompts, so a match is exact to the block.
+    """
+
+    def __init__(self, window=PREFIX_WINDOW, block=PREFIX_BLOCK_CHARS):
+        self.window = window
+        self.block = block
+        self.prompts = 0
+        self.chars = 0
+        self.shared_chars = 0
+        self._seen = {}    # model -> {prefix hash: prompts in the window that start with it}
+        self._order = {}   # model -> each prompt's prefix hashes in arrival order, for eviction
+        self._lock = threading.Lock()
+
+    def _prefix_hashes(self, prompt) -> tuple:
+        """Hash of prompt[:n] for every whole block boundary n, each chained on the previous one"""
+        hashes, digest = [], 0
+        for start in range(0, len(prompt) - self.block + 1, self.block):
+            digest = hash((digest, prompt[start:start + self.block]))
+            hashes.append(digest)
+        return tuple(hashes)
+
+    def add(self, model, prompt) -> int:
+        """Record one prompt; returns the characters it shares with an earlier one"""
+        hashes = self._prefix_hashes(prompt)
+        with self._lock:
+            seen = self._seen.setdefault(model, {})
+            arrivals = self._order.setdefault(model, deque())
+            blocks = 0
+            while blocks < len(hashes) and hashes[blocks] in seen:
+                blocks += 1
+            shared = blocks * self.block
+            for digest in hashes:
+                seen[digest] = seen.get(digest, 0) + 1
+            arrivals.append(hashes)
+            if len(arrivals) > self.window:
+                for digest in arrivals.popleft():
+                    seen[digest] -= 1
+                    if not seen[digest]:
+                        del seen[digest]
+            self.prompts += 1
+            self.chars += len(prompt)
+            self.shared_chars += shared
+        return shared
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "prompts": self.prompts,
+                "chars": self.chars,
+                "shared_chars": self.shared_chars,
+                "shared_ratio": round(self.shared_chars / self.chars, 4) if self.chars else 0.0,
+            }
+
+
+def shared_prefix_ratio(prompts, model="") -> float:
+    """Shared-prefix ratio of a sequence of prompt strings, as if sent in order"""
+    stats = PrefixStats(window=len(prompts) or 1)
+    for prompt in prompts:
+        stats.add(model, prompt)
+    return stats.stats()["shared_ratio"]
+
+
+class Metrics:
+    """Process-wide timing spans, token/cost accounting and gauge collectors.
+
+    Observations can be appended to a JSONL log; aggregates are exported as a
+    Prometheus text file (rewritten at most every `flush_seconds`) and summarized
+    for the sidebar Performance panel. All file I/O happens on one writer thread,
+    so recording never blocks on the disk or on another thread's write.
+    """
+
+    def __init__(self, log_path=METRICS_LOG_PATH, prom_path=METRICS_PROM_PATH, flush_seconds=METRICS_FLUSH_SECONDS):
+        self.log_path = log_path
+        self.prom_path = prom_path
+        self.flush_seconds = flush_seconds
+        self.stages = {}  # (stage, model) -> _StageStats
+        self.usage = {}   # model -> {"calls", "input_tokens", "output_tokens", "estimated_calls", "cost_usd"}
+        self.prefixes = PrefixStats()
+        self._collectors = {"prompt_prefix": self.prefixes.stats}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._events = queue.SimpleQueue()  # JSONL lines and flush requests for the writer thread
+        for path in (log_path, prom_path):
+            if path:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if log_path or prom_path:
+            threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True).start()
+
+    # ------------------------------
+    # Recording
+    # ------------------------------
+    @contextmanager
+    def span(self, stage, model=None, **fields):
+        """Time a block as one observation of `stage`; extra fields only go to the JSONL log"""
+        started = time.perf_counter()
+        error = None
+        try:
+            yield fields
+        except BaseException as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            if error:
+                fields["error"] = error
+            self.observe(stage, time.perf_counter() - started, model, **fields)
+
+    def observe(self, stage, seconds, model=None, **fields):
+        with self._lock:
+            self.stages.setdefault((stage, model or ""), _StageStats()).add(seconds)
+        self._log({"event": "span", "stage": stage, "model": model, "ms": round(seconds * 1000, 2), **fields})
+
+    def record_usage(self, model, input_tokens, output_tokens, estimated=False):
+        """Count one LLM call's tokens and cost; `estimated` when the provider sent no usage"""
+        cost = token_cost(model, input_tokens, output_tokens)
+        with self._lock:
+            usage = self.usage.setdefault(model, {
+                "calls": 0, "input_tokens": 0, "output_tokens": 0, "estimated_calls": 0, "cost_usd": 0.0,
+            })
+            usage["calls"] += 1
+            usage["input_tokens"] += input_tokens
+            usage["output_tokens"] += output_tokens
+            usage["estimated_calls"] += int(estimated)
+            usage["cost_usd"] += cost
+        self._log({"event": "usage", "model": model, "input_tokens": input_tokens, "output_tokens": output_tokens,
+                   "estimated": estimated, "cost_usd": round(cost, 8)})
+
+    def record_prompt(self, model, prompt):
+        """Track how much of `prompt` a provider prefix cache could reuse (see PrefixStats)"""
+        self.prefixes.add(model, prompt)
+
+    def register(self, name, collector):
+        """Export `collector()` -> {key: number} as `<prefix>_<name>_<key>` gauges"""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def _log(self, event):
+        if self.log_path:
+            self._events.put(json.dumps({"ts": round(time.time(), 3), **event}, ensure_ascii=False))
+
+    # ------------------------------
+    # Writer thread
+    # ------------------------------
+    def _write_loop(self):
+        """Append queued log lines in batches and rewrite the Prometheus file every `flush_seconds`"""
+        while True:
+            try:
+                items = [self._events.get(timeout=self.flush_seconds)]
+            except queue.Empty:
+                items = []
+            while True:
+                try:
+                    items.append(self._events.get_nowait())
+                except queue.Empty:
+                    break
+            lines = [item for item in items if isinstance(item, str)]
+            waiters = [item for item in items if isinstance(item, threading.Event)]
+            try:
+                if lines:
+                    self._append(lines)
+                if self.prom_path and (waiters or time.monotonic() - self._last_flush >= self.flush_seconds):
+                    self.write_prometheus()
+            except OSError:
+                pass  # metrics must never take the app down; the next batch retries
+            for done in waiters:
+                done.set()
+
+    def _append(self, lines):
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            size = f.tell()
+        if size >= METRICS_LOG_MAX_BYTES:
+            os.replace(self.log_path, f"{self.log_path}.1")
+
+    def flush(self, timeout=5.0):
+        """Block until everything logged so far is written and the Prometheus file is current"""
+        if not (self.log_path or self.prom_path):
+            return
+        done = threading.Event()
+        self._events.put(done)
+        done.wait(timeout)
+
+    # ------------------------------
+    # Export
+    # ------------------------------
+    def summary(self) -> dict:
+        """{"stages": {stage: {...ms}}, "models": {model: usage}, "prompt_prefix": {...}} for display"""
+        with self._lock:
+            merged = {}
+            for (stage, _), stats in self.stages.items():
+                merged.setdefault(stage, []).append(stats)
+            stages = {}
+            for stage, group in merged.items():
+                count = sum(stats.count for stats in group)
+                recent = [sample for stats in group for sample in stats.recent]
+                stages[stage] = {
+                    "count": count,
+                    "avg_ms": sum(stats.total for stats in group) / count * 1000,
+                    "p50_ms": percentile(recent, 50) * 1000,
+                    "p95_ms": percentile(recent, 95) * 1000,
+                }
+            models = {model: dict(usage) for model, usage in self.usage.items()}
+        return {"stages": stages, "models": models, "prompt_prefix": self.prefixes.stats()}
+
+    def recent(self, stage, model=None) -> list:
+        """The latest samples (seconds) of one stage for one model"""
+        with self._lock:
+            stats = self.stages.get((stage, model or ""))
+            return list(stats.recent) if stats else []
+
+    def _collect(self) -> dict:
+        gauges = {}
+        for name, collector in list(self._collectors.items()):
+            try:
+                values = collector()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[f"{METRIC_PREFIX}_{name}_{key}"] = value
+        return gauges
+
+    def prometheus_text(self) -> str:
+        """Aggregates in the Prometheus text exposition format"""
+        lines = [f"# TYPE {METRIC_PREFIX}_stage_seconds histogram"]
+        with self._lock:
+            for (stage, model), stats in sorted(self.stages.items()):
+                labels = f'stage="{stage}",model="{model}"'
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + (float("inf"),), stats.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{METRIC_PREFIX}_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{METRIC_PREFIX}_stage_seconds_sum{{{labels}}} {stats.total:.6f}")
+                lines.append(f"{METRIC_PREFIX}_stage_seconds_count{{{labels}}} {stats.count}")
+            for name in ("calls", "input_tokens", "output_tokens", "estimated_calls", "cost_usd"):
+                metric = f"{METRIC_PREFIX}_llm_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for model, usage in sorted(self.usage.items()):
+                    lines.append(f'{metric}{{model="{model}"}} {usage[name]}')
+        for metric, value in sorted(self._collect().items()):
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self):
+        """Atomically rewrite the text file a local scraper (node_exporter textfile) reads"""
+        self._last_flush = time.monotonic()
+        if not self.prom_path:
+            return
+        with self._flush_lock:
+            tmp_path = f"{self.prom_path}.{socket.gethostname()}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, self.prom_path)
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Process-wide metrics registry shared by the UI, workers and batch runs"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
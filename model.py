@@ -1,22 +1,28 @@
 # app.py
 import os
-import time
+import html
 import json
+import time
+import hashlib
 import streamlit as st
 from dotenv import load_dotenv
-from pypdf import PdfReader
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_groq import ChatGroq
-from pydantic import BaseModel, Field
-from typing import List, Optional
 
 import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime
-import re
+
+from engine import (
+    MODEL_OPTIONS, ANALYSIS_DEPTHS, AUTO_MODEL, EXECUTION_MODES, LOCAL_ONLY_DEPTHS, RESULT_FIELDS,
+    analysis_snapshot, get_client
+)
+from result_cache import AnalysisCache
+from corpus_store import CorpusStore
+from job_queue import JobQueue, PENDING_STATUSES
+from metrics import get_metrics
+from pdf_extract import extract_pdf_text
+from ingest import MAX_FILE_BYTES
+from results import AnalysisRecord, split_list
 port = int(os.environ.get("PORT", 8501))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", 0.5))
 
 # ------------------------------
 # Config / Load key
@@ -34,190 +40,21 @@ st.set_page_config(
 # ------------------------------
 # Advanced Modern CSS 
 # ------------------------------
-st.markdown(
-    """
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    :root {
-      --primary: #6366f1;
-      --secondary: #8b5cf6;
-      --success: #10b981;
-      --warning: #f59e0b;
-      --danger: #ef4444;
-      --bg-primary: #0f172a;
-      --bg-secondary: #1e293b;
-      --bg-tertiary: #334155;
-      --text-primary: #f8fafc;
-      --text-secondary: #cbd5e1;
-      --text-muted: #64748b;
-      --border: #334155;
-      --shadow: rgba(0, 0, 0, 0.3);
-    }
-    
-    * { font-family: 'Inter', sans-serif; }
-    
-    .stApp {
-        background: linear-gradient(135deg, #0f172a 0%, #1e293b 50%, #0f172a 100%);
-        color: var(--text-primary);
-    }
-    
-    .main-header {
-        background: linear-gradient(135deg, var(--primary), var(--secondary));
-        padding: 2rem;
-        border-radius: 16px;
-        margin-bottom: 2rem;
-        box-shadow: 0 10px 25px var(--shadow);
-        text-align: center;
-    }
-    
-    .main-header h1 {
-        color: white;
-        font-size: 3rem;
-        font-weight: 700;
-        margin: 0;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-    }
-    
-    .main-header p {
-        color: rgba(255,255,255,0.9);
-        font-size: 1.2rem;
-        margin: 0.5rem 0 0 0;
-        font-weight: 300;
-    }
-    
-    .card {
-        background: var(--bg-secondary);
-        border-radius: 16px;
-        padding: 1.5rem;
-        border: 1px solid var(--border);
-        box-shadow: 0 4px 6px var(--shadow);
-        margin-bottom: 1rem;
-        transition: transform 0.2s ease;
-    }
-    
-    .card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 15px var(--shadow);
-    }
-    
-    .metric-card {
-        background: linear-gradient(135deg, var(--bg-secondary), var(--bg-tertiary));
-        border-radius: 12px;
-        padding: 1.5rem;
-        text-align: center;
-        border: 1px solid var(--border);
-        transition: all 0.3s ease;
-    }
-    
-    .metric-card:hover {
-        transform: scale(1.02);
-        border-color: var(--primary);
-    }
-    
-    .metric-value {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: var(--primary);
-        margin: 0.5rem 0;
-    }
-    
-    .metric-label {
-        color: var(--text-secondary);
-        font-size: 0.9rem;
-        font-weight: 500;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    
-    .skill-chip {
-        display: inline-block;
-        padding: 0.5rem 1rem;
-        margin: 0.25rem;
-        border-radius: 20px;
-        font-size: 0.85rem;
-        font-weight: 500;
-        transition: all 0.2s ease;
-        white-space: nowrap;
-        min-width: fit-content;
-    }
-    
-    .skill-matched {
-        background: linear-gradient(45deg, var(--success), #059669);
-        color: white;
-    }
-    
-    .skill-missing {
-        background: linear-gradient(45deg, var(--danger), #dc2626);
-        color: white;
-    }
-    
-    .skill-extra {
-        background: linear-gradient(45deg, var(--warning), #d97706);
-        color: white;
-    }
-    
-    .skill-chip:hover {
-        transform: scale(1.05);
-        box-shadow: 0 4px 8px var(--shadow);
-    }
-    
-    .skills-container {
-        display: flex;
-        flex-wrap: wrap;
-        gap: 0.5rem;
-        margin: 1rem 0;
-    }
-    
-    .no-skills {
-        color: var(--text-muted);
-        font-style: italic;
-        padding: 1rem;
-        text-align: center;
-        background: var(--bg-tertiary);
-        border-radius: 8px;
-    }
-    
-    .progress-container {
-        background: var(--bg-tertiary);
-        border-radius: 10px;
-        padding: 0.5rem;
-        margin: 1rem 0;
-    }
-    
-    .recommendation-item {
-        background: var(--bg-secondary);
-        border-left: 4px solid var(--primary);
-        padding: 1rem;
-        margin: 0.5rem 0;
-        border-radius: 0 8px 8px 0;
-    }
-    
-    .status-badge {
-        padding: 0.25rem 0.75rem;
-        border-radius: 12px;
-        font-size: 0.8rem;
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    
-    .status-excellent { background: var(--success); color: white; }
-    .status-good { background: var(--warning); color: white; }
-    .status-poor { background: var(--danger); color: white; }
-    
-    .animation-fade-in {
-        animation: fadeIn 0.8s ease-in;
-    }
-    
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "style.css")
+
+@st.cache_resource
+def load_css():
+    """(stylesheet, short content hash that busts the browser cache when it changes)"""
+    with open(CSS_PATH, encoding="utf-8") as f:
+        css = f.read()
+    return css, hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+
+css, css_version = load_css()
+if st.get_option("server.enableStaticServing"):
+    # One short <link> per rerun instead of the whole stylesheet; the browser fetches and caches it once
+    st.markdown(f'<link rel="stylesheet" href="app/static/style.css?v={css_version}">', unsafe_allow_html=True)
+else:
+    st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
 
 # ------------------------------
 # Header
@@ -232,6 +69,52 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# ------------------------------
+# Result Cache
+# ------------------------------
+@st.cache_resource
+def get_analysis_cache():
+    cache = AnalysisCache()
+    get_metrics().register("analysis_cache", cache.stats)
+    return cache
+
+@st.cache_resource
+def get_corpus_store():
+    return CorpusStore()
+
+# ------------------------------
+# LLM Client (one per process, shared across reruns and sessions)
+# ------------------------------
+@st.cache_resource
+def get_llm_client():
+    client = get_client()
+    get_metrics().register("llm_client", lambda: {
+        "retries": client.retries,
+        "coalesced": client.flights.shared,
+        "in_flight": client.flights.in_flight(),
+    })
+    return client
+
+# ------------------------------
+# Background Job Queue (worker threads shared by every session)
+# ------------------------------
+def store_completed_analysis(params, run):
+    """Persist finished jobs for later skill queries without re-running the LLM"""
+    get_corpus_store().add_analysis(
+        params["resume_text"],
+        params["job_description"],
+        run.result,
+        model=run.routed_model or params["model"],
+        depth=params["depth"],
+        resume_name=params["resume_name"],
+    )
+
+@st.cache_resource
+def get_job_queue():
+    queue = JobQueue(client=get_llm_client(), cache=get_analysis_cache(), on_complete=store_completed_analysis)
+    get_metrics().register("jobs", queue.stats)
+    return queue
+
 # ------------------------------
 # Sidebar Configuration
 # ------------------------------
@@ -239,24 +122,37 @@ with st.sidebar:
     st.markdown("### ⚙️ Configuration")
     
     # Model selection
-    model_options = [
-        "llama-3.1-8b-instant",
-        "qwen/qwen3-32b",
-        "llama-3.3-70b-versatile",
-        "openai/gpt-oss-120b"
-    ]
-    selected_model = st.selectbox("🤖 AI Model", model_options, index=0)
+    model_options = [AUTO_MODEL] + MODEL_OPTIONS
+    selected_model = st.selectbox(
+        "🤖 AI Model",
+        model_options,
+        index=0,
+        help="Auto picks a model per analysis from the depth, input size, rate-limit headroom and recent latency."
+    )
     
     # Analysis depth
     analysis_depth = st.select_slider(
         "📊 Analysis Depth",
-        options=["Quick", "Standard", "Deep", "Comprehensive"],
-        value="Standard"
+        options=ANALYSIS_DEPTHS,
+        value="Standard",
+        help="Quick runs a local skill match with no AI call."
     )
     
     # Temperature setting
     temperature = st.slider("🌡️ Creativity", 0.0, 1.0, 0.1, 0.1)
     
+    # Execution mode
+    execution_mode = st.radio(
+        "🧩 Execution Mode",
+        EXECUTION_MODES,
+        help="Parallel sections splits the analysis into concurrent calls (skills and salary on the fast 8B model)."
+    )
+    use_jd_profile = st.checkbox(
+        "📌 Reuse JD profile",
+        help="Condense the job description once into a cached profile and send that instead of the full text, "
+             "leaving more of the prompt for the resume."
+    )
+    
     st.markdown("---")
     st.markdown("### 📈 Session Stats")
     
@@ -265,115 +161,46 @@ with st.sidebar:
         st.session_state.analysis_count = 0
     if 'best_match' not in st.session_state:
         st.session_state.best_match = 0
+    if 'counted_jobs' not in st.session_state:
+        st.session_state.counted_jobs = set()
     
     st.metric("Analyses Run", st.session_state.analysis_count)
     st.metric("Best Match %", f"{st.session_state.best_match}%")
 
-# ------------------------------
-# API Key Validation
-# ------------------------------
-if not GROQ_API_KEY:
-    st.error("🔑 GROQ_API_KEY not found. Please set it in your `.env` file.", icon="⚠️")
-    st.stop()
+    cache_stats = get_analysis_cache().stats()
+    st.caption(
+        f"⚡ Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['entries']} stored)"
+    )
+    job_stats = get_job_queue().stats()
+    st.caption(f"🧵 Jobs: {job_stats['running']} running / {job_stats['queued']} queued")
 
-# ------------------------------
-# LLM Setup
-# ------------------------------
-llm = ChatGroq(api_key=GROQ_API_KEY, model=selected_model, temperature=temperature)
+    st.markdown("### ⏱️ Performance")
+    # Filled in at the end of the script so it includes this run's analysis and rendering
+    performance_panel = st.empty()
 
 # ------------------------------
-# Enhanced Prompts with Better Structure
+# API Key Validation
 # ------------------------------
-# Pydantic model for structured output
-class ResumeAnalysisResult(BaseModel):
-    skills_matched: str = Field(description="Skills present in both JD and resume - comma-separated string")
-    skills_missing: str = Field(description="Critical skills missing from resume - comma-separated string")
-    skills_extra: str = Field(description="Additional skills in resume not required by JD - comma-separated string")
-    experience_match: str = Field(description="How well experience aligns with requirements")
-    education_match: str = Field(description="Education alignment assessment")
-    overall_match_percentage: int = Field(description="Overall match percentage (0-100)")
-    selection_probability: str = Field(description="Likelihood of selection (High/Medium/Low)")
-    strength_areas: str = Field(description="Top 3 candidate strengths - comma-separated string")
-    improvement_areas: str = Field(description="Top 3 areas needing improvement - comma-separated string")
-    specific_recommendations: str = Field(description="Actionable improvement steps - comma-separated string")
-    interview_preparation: str = Field(description="Suggested interview focus areas - comma-separated string")
-    salary_competitiveness: str = Field(description="Salary negotiation position assessment")
-
-output_parser = JsonOutputParser(pydantic_object=ResumeAnalysisResult)
-format_instructions = output_parser.get_format_instructions()
-
-prompt_compare = PromptTemplate(
-    input_variables=["job_description", "resume_text", "format_instructions", "depth"],
-    template="""
-You are a senior HR consultant providing comprehensive resume-job matching analysis.
-Analysis depth: {depth}
-
-IMPORTANT: For all array fields (skills_matched, skills_missing, skills_extra, strength_areas, improvement_areas, specific_recommendations, interview_preparation), return the values as comma-separated strings, NOT as arrays. 
-
-For example:
-- CORRECT: "Python, JavaScript, React, Node.js"
-- WRONG: ["Python", "JavaScript", "React", "Node.js"]
-
-Perform detailed analysis:
-
-1. **Skill Matching**: 
-   - Extract complete skill names (not individual characters)
-   - Match technical skills, soft skills, tools, technologies
-   - Consider synonyms (e.g., "JS" = "JavaScript", "React.js" = "React")
-
-2. **Experience Analysis**: Compare years, relevance, industry alignment
-
-3. **Education Assessment**: Degree requirements vs candidate qualifications
-
-4. **Overall Scoring**: Weighted scoring based on critical vs nice-to-have requirements
-
-Return analysis following this exact format:
-{format_instructions}
-
-Job Description:
-{job_description}
-
-Resume:
-{resume_text}
-"""
-)
+if not GROQ_API_KEY:
+    if analysis_depth not in LOCAL_ONLY_DEPTHS:
+        st.error("🔑 GROQ_API_KEY not found. Please set it in your `.env` file.", icon="⚠️")
+        st.stop()
+    st.warning("🔑 GROQ_API_KEY not found - only the local Quick analysis is available.", icon="⚠️")
 
 # ------------------------------
 # Utility Functions
 # ------------------------------
 def pdf_to_text(file) -> str:
+    if file.size > MAX_FILE_BYTES:
+        st.error(f"❌ PDF is larger than the {MAX_FILE_BYTES // (1024 * 1024)} MB limit.")
+        return ""
     try:
-        reader = PdfReader(file)
-        text_parts = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                text_parts.append(text)
-        return "\n".join(text_parts)
+        return extract_pdf_text(file.getvalue())
     except Exception as e:
         st.error(f"❌ Failed to read PDF: {e}")
         return ""
 
-def parse_comma_separated(value):
-    """Parse comma-separated string into list of clean strings"""
-    if not value:
-        return []
-    
-    if isinstance(value, list):
-        return [str(item).strip() for item in value if str(item).strip()]
-    
-    # Handle string input
-    if isinstance(value, str):
-        # Remove brackets if present
-        value = re.sub(r'[\[\]"]', '', value)
-        # Split by comma and clean
-        items = [item.strip() for item in value.split(',') if item.strip()]
-        # Filter out single characters (likely parsing errors)
-        items = [item for item in items if len(item) > 1]
-        return items
-    
-    return []
-
 def create_match_gauge(percentage):
     """Create a modern gauge chart for match percentage"""
     fig = go.Figure(go.Indicator(
@@ -407,27 +234,21 @@ def create_match_gauge(percentage):
     
     return fig
 
-def render_skill_chips(skills, chip_type="matched"):
-    """Render skills as interactive chips with proper parsing"""
-    # Parse skills if they're in string format
-    if isinstance(skills, str):
-        skills = parse_comma_separated(skills)
-    elif not isinstance(skills, list):
-        skills = []
-    
-    if not skills:
-        st.markdown('<div class="no-skills">No skills identified</div>', unsafe_allow_html=True)
-        return
-    
-    # Create chips HTML
-    chips_html = '<div class="skills-container">'
-    for skill in skills:
-        skill_clean = str(skill).strip()
-        if skill_clean and len(skill_clean) > 1:  # Avoid single characters
-            chips_html += f'<span class="skill-chip skill-{chip_type}">{skill_clean}</span>'
-    chips_html += '</div>'
-    
-    st.markdown(chips_html, unsafe_allow_html=True)
+@st.cache_resource(max_entries=101)
+def cached_match_gauge(percentage):
+    """One shared gauge figure per percentage (st.plotly_chart only serializes it)"""
+    return create_match_gauge(percentage)
+
+def _text(value) -> str:
+    """LLM text as safe inline HTML"""
+    return html.escape(str(value)).replace("\n", "<br>")
+
+def skill_chips_html(skills, chip_type="matched") -> str:
+    """Skills (a list or a comma-separated string) as a single chips block"""
+    chips = "".join(f'<span class="skill-chip skill-{chip_type}">{_text(skill)}</span>' for skill in split_list(skills))
+    if not chips:
+        return '<div class="no-skills">No skills identified</div>'
+    return f'<div class="skills-container">{chips}</div>'
 
 def get_status_badge(percentage):
     """Get status badge based on percentage"""
@@ -438,13 +259,169 @@ def get_status_badge(percentage):
     else:
         return '<span class="status-badge status-poor">Needs Improvement</span>'
 
+def _numbered_html(value) -> str:
+    items = split_list(value)
+    return "".join(f"<p><strong>{i}.</strong> {_text(item)}</p>" for i, item in enumerate(items, 1))
+
+def _card(title, body) -> str:
+    return f'<div class="card"><h3>{title}</h3>{body}</div>'
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def result_fragments(analysis_result, _record) -> dict:
+    """The results page as a few pre-built HTML blocks, cached on the hash of the result.
+
+    `_record` is the caller's AnalysisRecord of the same result (unhashed by Streamlit).
+    Each block goes out as one markdown delta instead of dozens of small ones.
+    Blocks are single-line so markdown never splits them into paragraphs.
+    """
+    record = _record
+    match_percentage = record.overall_match_percentage
+    skills = {name: getattr(record, name) for name in ("skills_matched", "skills_missing", "skills_extra")}
+
+    metric_cards = [
+        ("✅ Matched Skills", len(skills["skills_matched"]), ""),
+        ("❌ Missing Skills", len(skills["skills_missing"]), ""),
+        ("➕ Extra Skills", len(skills["skills_extra"]), ""),
+        ("🎯 Match Score", f"{match_percentage}%", get_status_badge(match_percentage)),
+    ]
+    metrics = '<div class="metric-grid">' + "".join(
+        f'<div class="metric-card"><div class="metric-label">{label}</div>'
+        f'<div class="metric-value">{value}</div>{badge}</div>'
+        for label, value, badge in metric_cards
+    ) + "</div>"
+
+    skills_card = _card("🎯 Skills Analysis", (
+        "<h4>✅ Matched Skills</h4>" + skill_chips_html(skills["skills_matched"], "matched")
+        + "<h4>❌ Missing Critical Skills</h4>" + skill_chips_html(skills["skills_missing"], "missing")
+        + "<h4>➕ Additional Skills</h4>" + skill_chips_html(skills["skills_extra"], "extra")
+    ))
+    assessment_card = _card("📈 Overall Assessment", (
+        f"<p><strong>Selection Probability:</strong> "
+        f"<code>{_text(analysis_result.get('selection_probability', 'Unknown'))}</code></p>"
+        f"<p><strong>Experience Match:</strong> {_text(analysis_result.get('experience_match', 'Not assessed'))}</p>"
+        f"<p><strong>Education Match:</strong> {_text(analysis_result.get('education_match', 'Not assessed'))}</p>"
+    ))
+    strengths_card = _card("💪 Key Strengths", _numbered_html(record.strength_areas))
+    improvements_card = _card("🎯 Improvement Areas", _numbered_html(record.improvement_areas))
+    recommendations = _card("🚀 Actionable Recommendations", "".join(
+        f'<div class="recommendation-item"><strong>{i}.</strong> {_text(rec)}</div>'
+        for i, rec in enumerate(record.specific_recommendations, 1)
+    ))
+
+    extras = ""
+    if record.interview_preparation:
+        extras += _card("🎤 Interview Preparation", _numbered_html(record.interview_preparation))
+    if analysis_result.get("salary_competitiveness", ""):
+        salary_info = _text(analysis_result["salary_competitiveness"])
+        extras += _card("💰 Salary Negotiation Position", f"<p>{salary_info}</p>")
+
+    return {
+        "metrics": metrics,
+        "details": f'<div class="two-col">{skills_card}{assessment_card}</div>',
+        "strengths": f'<div class="two-col">{strengths_card}{improvements_card}</div>',
+        "recommendations": recommendations,
+        "extras": extras,
+    }
+
+def render_partial_results(fields):
+    """Live preview of the fields that have finished streaming so far"""
+    st.markdown("#### ⏳ Live results")
+    if "overall_match_percentage" in fields:
+        percentage = int(fields["overall_match_percentage"] or 0)
+        st.plotly_chart(cached_match_gauge(percentage), use_container_width=True, key=f"live_gauge_{len(fields)}")
+    # Everything else as one HTML block, i.e. one delta per refresh
+    parts = []
+    for field_name, label, chip_type in [
+        ("skills_matched", "✅ Matched Skills", "matched"),
+        ("skills_missing", "❌ Missing Skills", "missing"),
+        ("skills_extra", "➕ Additional Skills", "extra"),
+    ]:
+        if field_name in fields:
+            parts.append(f"<p><strong>{label}</strong></p>" + skill_chips_html(fields[field_name], chip_type))
+    for field_name, label in [
+        ("experience_match", "Experience Match"),
+        ("education_match", "Education Match"),
+        ("selection_probability", "Selection Probability"),
+    ]:
+        if field_name in fields:
+            parts.append(f"<p><strong>{label}:</strong> {_text(fields[field_name])}</p>")
+    for field_name, label in [
+        ("strength_areas", "💪 Key Strengths"),
+        ("improvement_areas", "🎯 Improvement Areas"),
+        ("specific_recommendations", "🚀 Recommendations"),
+        ("interview_preparation", "🎤 Interview Preparation"),
+    ]:
+        if field_name in fields:
+            parts.append(f"<p><strong>{label}</strong></p>" + _numbered_html(fields[field_name]))
+    if parts:
+        st.markdown("".join(parts), unsafe_allow_html=True)
+
+def render_performance_panel(model):
+    """Per-stage latency and token/cost totals (process-wide, since startup)"""
+    summary = get_metrics().summary()
+    for name in (summary["models"] or [model]) if model == AUTO_MODEL else [model]:
+        usage = summary["models"].get(name)
+        if usage:
+            st.caption(
+                f"🤖 {name}: {usage['calls']} calls · {usage['input_tokens']:,} in / "
+                f"{usage['output_tokens']:,} out tokens · ${usage['cost_usd']:.4f}"
+            )
+        else:
+            st.caption(f"🤖 {name}: no calls yet")
+    prefix = summary["prompt_prefix"]
+    if prefix["prompts"]:
+        st.caption(f"♻️ Shared prompt prefix: {prefix['shared_ratio']:.0%} of {prefix['prompts']} prompts")
+    if summary["stages"]:
+        st.dataframe(
+            [
+                {"Stage": stage, "Calls": stats["count"], "p50 ms": round(stats["p50_ms"], 1),
+                 "p95 ms": round(stats["p95_ms"], 1)}
+                for stage, stats in sorted(summary["stages"].items())
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+
+def forget_job():
+    """Stop showing the current job (it keeps running if still in flight)"""
+    st.session_state.pop("job_id", None)
+    st.query_params.pop("job", None)
+
+def await_job(job_id):
+    """Poll a job until it finishes, rendering streamed fields as they land"""
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None or job["status"] not in PENDING_STATUSES:
+        return job
+    
+    status_note = st.empty()
+    progress_bar = st.progress(0)
+    live_preview = st.empty()
+    rendered = -1
+    while job is not None and job["status"] in PENDING_STATUSES:
+        status_note.info(
+            f"🧠 Analysis {job['status']} in the background (job `{job_id[:8]}`) - "
+            "you can refresh this page and it will pick up where it left off."
+        )
+        fields = job["fields"]
+        if len(fields) != rendered:
+            rendered = len(fields)
+            progress_bar.progress(min(rendered / len(RESULT_FIELDS), 1.0))
+            with live_preview.container():
+                render_partial_results(fields)
+        time.sleep(JOB_POLL_SECONDS)
+        job = queue.get(job_id)
+    status_note.empty()
+    progress_bar.empty()
+    live_preview.empty()
+    return job
+
 # ------------------------------
 # Main Interface
 # ------------------------------
 col1, col2 = st.columns([1, 1], gap="large")
 
-with col1:
-    st.markdown('<div class="card">', unsafe_allow_html=True)
+with col1, st.container(border=True):
     st.markdown("### 📋 Job Description")
     job_description = st.text_area(
         "Paste the complete job description",
@@ -452,10 +429,8 @@ with col1:
         placeholder="Paste the full job description here...\n\nInclude:\n• Role responsibilities\n• Required skills\n• Experience requirements\n• Education requirements\n• Company culture details",
         help="The more detailed the job description, the better the analysis will be."
     )
-    st.markdown('</div>', unsafe_allow_html=True)
 
-with col2:
-    st.markdown('<div class="card">', unsafe_allow_html=True)
+with col2, st.container(border=True):
     st.markdown("### 👤 Resume")
     
     resume_input_method = st.radio(
@@ -476,7 +451,6 @@ with col2:
         if uploaded_file:
             with st.spinner("🔍 Extracting text from PDF..."):
                 resume_text = pdf_to_text(uploaded_file)
-                time.sleep(0.5)  # Visual feedback
             
             if resume_text:
                 st.success(f"✅ PDF processed successfully! Extracted {len(resume_text)} characters.")
@@ -492,8 +466,6 @@ with col2:
             placeholder="Paste your complete resume here...\n\nInclude:\n• Contact information\n• Professional summary\n• Work experience\n• Education\n• Skills\n• Projects/Achievements",
             help="Include all sections of your resume for comprehensive analysis"
         )
-    
-    st.markdown('</div>', unsafe_allow_html=True)
 
 # ------------------------------
 # Analysis Buttons
@@ -517,57 +489,83 @@ with button_col3:
     )
 
 if clear_btn:
+    forget_job()
     st.rerun()
 
 # ------------------------------
-# Complete Analysis
+# Complete Analysis (queued, runs on the background workers)
 # ------------------------------
 if compare_btn:
     if not job_description or not resume_text:
         st.error("❌ Both job description and resume are required for analysis.")
     else:
-        with st.spinner("🧠 Running comprehensive AI analysis..."):
-            progress_bar = st.progress(0)
-            
-            try:
-                progress_bar.progress(50)
-                system_msg = SystemMessage(content="""You are a senior HR consultant. 
-                CRITICAL: For all list/array fields, return comma-separated strings, NOT JSON arrays.
-                Example: "Python, JavaScript, React" NOT ["Python", "JavaScript", "React"]
-                Return only valid JSON following the exact schema provided.""")
-                
-                human_msg = HumanMessage(content=prompt_compare.format(
-                    job_description=job_description,
-                    resume_text=resume_text,
-                    format_instructions=format_instructions,
-                    depth=analysis_depth
-                ))
-                
-                response = llm.invoke([system_msg, human_msg])
-                raw_output = response.content
-                
-                progress_bar.progress(100)
-                time.sleep(0.5)
-                progress_bar.empty()
-                
-                # Parse the structured output
-                try:
-                    analysis_result = output_parser.parse(raw_output)
-                except Exception as parse_error:
-                    st.error(f"❌ Failed to parse AI response: {parse_error}")
-                    with st.expander("🔧 Debug - Raw AI Response"):
-                        st.code(raw_output, language="json")
-                    st.stop()
-                
-            except Exception as e:
-                st.error(f"❌ Analysis failed: {e}")
-                st.stop()
+        job_id = get_job_queue().submit(
+            job_description,
+            resume_text,
+            model=selected_model,
+            temperature=temperature,
+            depth=analysis_depth,
+            sectioned=execution_mode == "Parallel sections",
+            resume_name=uploaded_file.name if resume_input_method == "📁 Upload PDF" else None,
+            # Only sections whose inputs changed since the last analysis are re-run
+            previous=st.session_state.get("last_analysis"),
+            jd_profile=use_jd_profile,
+        )
+        st.session_state.job_id = job_id
+        # Keep the id in the URL so a browser refresh resumes the same job
+        st.query_params["job"] = job_id
+
+active_job_id = st.session_state.get("job_id") or st.query_params.get("job")
+if active_job_id:
+    job = await_job(active_job_id)
+    if job is None:
+        st.warning("⚠️ That analysis job is no longer available - please run the analysis again.")
+        forget_job()
+    elif job["status"] == "failed":
+        st.error(f"❌ Analysis failed: {job['error']}")
+        if job["raw_output"]:
+            with st.expander("🔧 Debug - Raw AI Response"):
+                st.code(job["raw_output"], language="json")
+    else:
+        analysis_result = job["result"]
+        meta = job["meta"]
+        params = job["params"]
+        # Baseline for incremental re-analysis; defaulted placeholders are never worth reusing
+        if st.session_state.get("snapshot_job_id") != active_job_id and not meta.get("defaulted_fields"):
+            st.session_state.snapshot_job_id = active_job_id
+            st.session_state.last_analysis = analysis_snapshot(
+                params["job_description"], params["resume_text"], analysis_result,
+                meta.get("routed_model") or params["model"], params["temperature"], params["depth"],
+                params.get("jd_profile", False), params["sectioned"],
+            )
+        # Cache hits skip Groq entirely, so show the stored result as the raw output
+        raw_output = job["raw_output"] or json.dumps(analysis_result, indent=2)
+        if meta.get("routed_model"):
+            st.caption(f"🧭 Auto-routed to `{meta['routed_model']}`")
+        if meta.get("cached"):
+            st.info("⚡ Loaded from cache - identical inputs were analyzed before.")
+        if meta.get("coalesced"):
+            st.info("🔗 Shared result - an identical analysis was already in progress.")
+        if meta.get("reused_fields"):
+            st.info(
+                f"♻️ Incremental update - reused {len(meta['reused_fields'])} fields whose inputs didn't change "
+                "since your last analysis."
+            )
+        if meta.get("reasked_fields"):
+            st.info(f"🔧 Repaired response - re-requested only: {', '.join(meta['reasked_fields'])}")
+        if meta.get("defaulted_fields"):
+            st.warning(f"⚠️ Could not recover: {', '.join(meta['defaulted_fields'])} (shown as defaults)")
+        render_started = time.perf_counter()
         
-        # Update session stats
-        st.session_state.analysis_count += 1
-        match_percentage = int(analysis_result.get("overall_match_percentage", 0))
-        if match_percentage > st.session_state.best_match:
-            st.session_state.best_match = match_percentage
+        # Update session stats (once per job, not on every rerun that re-displays it)
+        # Every list field is split once here, for both the cached fragments and the exports below
+        record = AnalysisRecord.from_result(analysis_result)
+        match_percentage = record.overall_match_percentage
+        if active_job_id not in st.session_state.counted_jobs:
+            st.session_state.counted_jobs.add(active_job_id)
+            st.session_state.analysis_count += 1
+            if match_percentage > st.session_state.best_match:
+                st.session_state.best_match = match_percentage
         
         st.success("✅ Comprehensive analysis completed!")
         
@@ -576,136 +574,27 @@ if compare_btn:
         # ------------------------------
         st.markdown("## 📊 Analysis Results")
         
-        # Parse skills with better handling
-        skills_matched = parse_comma_separated(analysis_result.get("skills_matched", ""))
-        skills_missing = parse_comma_separated(analysis_result.get("skills_missing", ""))
-        skills_extra = parse_comma_separated(analysis_result.get("skills_extra", ""))
+        skills_matched = list(record.skills_matched)
+        skills_missing = list(record.skills_missing)
+        skills_extra = list(record.skills_extra)
+        selection_prob = analysis_result.get("selection_probability", "Unknown")
+        fragments = result_fragments(analysis_result, record)
         
         # Overall metrics
-        metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
-        
-        with metric_col1:
-            st.markdown(f'''
-            <div class="metric-card">
-                <div class="metric-label">✅ Matched Skills</div>
-                <div class="metric-value">{len(skills_matched)}</div>
-            </div>
-            ''', unsafe_allow_html=True)
-        
-        with metric_col2:
-            st.markdown(f'''
-            <div class="metric-card">
-                <div class="metric-label">❌ Missing Skills</div>
-                <div class="metric-value">{len(skills_missing)}</div>
-            </div>
-            ''', unsafe_allow_html=True)
-        
-        with metric_col3:
-            st.markdown(f'''
-            <div class="metric-card">
-                <div class="metric-label">➕ Extra Skills</div>
-                <div class="metric-value">{len(skills_extra)}</div>
-            </div>
-            ''', unsafe_allow_html=True)
-        
-        with metric_col4:
-            st.markdown(f'''
-            <div class="metric-card">
-                <div class="metric-label">🎯 Match Score</div>
-                <div class="metric-value">{match_percentage}%</div>
-                {get_status_badge(match_percentage)}
-            </div>
-            ''', unsafe_allow_html=True)
+        st.markdown(fragments["metrics"], unsafe_allow_html=True)
         
         # Match score visualization
-        st.plotly_chart(create_match_gauge(match_percentage), use_container_width=True)
-        
-        # Progress bar
-        st.markdown('<div class="progress-container">', unsafe_allow_html=True)
+        st.plotly_chart(cached_match_gauge(match_percentage), use_container_width=True)
         st.progress(match_percentage / 100)
-        st.markdown('</div>', unsafe_allow_html=True)
         
-        # Detailed analysis
-        analysis_col1, analysis_col2 = st.columns([1, 1])
+        # Detailed analysis, strengths / improvements, recommendations
+        st.markdown(fragments["details"], unsafe_allow_html=True)
+        st.markdown(fragments["strengths"], unsafe_allow_html=True)
+        st.markdown(fragments["recommendations"], unsafe_allow_html=True)
         
-        with analysis_col1:
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            st.markdown("### 🎯 Skills Analysis")
-            
-            st.markdown("#### ✅ **Matched Skills**")
-            render_skill_chips(skills_matched, "matched")
-            
-            st.markdown("#### ❌ **Missing Critical Skills**")
-            render_skill_chips(skills_missing, "missing")
-            
-            st.markdown("#### ➕ **Additional Skills**")
-            render_skill_chips(skills_extra, "extra")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with analysis_col2:
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            st.markdown("### 📈 **Overall Assessment**")
-            
-            selection_prob = analysis_result.get("selection_probability", "Unknown")
-            exp_match = analysis_result.get("experience_match", "Not assessed")
-            edu_match = analysis_result.get("education_match", "Not assessed")
-            
-            st.markdown(f"""
-            **Selection Probability:** `{selection_prob}`
-            
-            **Experience Match:** {exp_match}
-            
-            **Education Match:** {edu_match}
-            """)
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Strengths and improvements
-        strength_col, improvement_col = st.columns([1, 1])
-        
-        with strength_col:
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            st.markdown("### 💪 **Key Strengths**")
-            strengths = parse_comma_separated(analysis_result.get("strength_areas", ""))
-            for i, strength in enumerate(strengths, 1):
-                st.markdown(f"**{i}.** {strength}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with improvement_col:
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            st.markdown("### 🎯 **Improvement Areas**")
-            improvements = parse_comma_separated(analysis_result.get("improvement_areas", ""))
-            for i, improvement in enumerate(improvements, 1):
-                st.markdown(f"**{i}.** {improvement}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Recommendations
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown("### 🚀 **Actionable Recommendations**")
-        recommendations = parse_comma_separated(analysis_result.get("specific_recommendations", ""))
-        for i, rec in enumerate(recommendations, 1):
-            st.markdown(f'''
-            <div class="recommendation-item">
-                <strong>{i}.</strong> {rec}
-            </div>
-            ''', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Interview preparation
-        interview_prep = parse_comma_separated(analysis_result.get("interview_preparation", ""))
-        if interview_prep:
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            st.markdown("### 🎤 **Interview Preparation**")
-            for i, prep in enumerate(interview_prep, 1):
-                st.markdown(f"**{i}.** {prep}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Salary insights
-        salary_info = analysis_result.get("salary_competitiveness", "")
-        if salary_info:
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            st.markdown("### 💰 **Salary Negotiation Position**")
-            st.markdown(salary_info)
-            st.markdown('</div>', unsafe_allow_html=True)
+        # Interview preparation and salary insights
+        if fragments["extras"]:
+            st.markdown(fragments["extras"], unsafe_allow_html=True)
         
         # Export results
         st.markdown("### 📄 **Export Results**")
@@ -732,6 +621,7 @@ if compare_btn:
         
         with export_col2:
             if st.button("🔄 **Run New Analysis**", use_container_width=True):
+                forget_job()
                 st.rerun()
         
         # Debug information
@@ -742,6 +632,33 @@ if compare_btn:
                 "parsed_skills_missing": skills_missing,
                 "parsed_skills_extra": skills_extra
             })
+        
+        get_metrics().observe("render", time.perf_counter() - render_started,
+                              meta.get("routed_model") or params["model"])
+
+# ------------------------------
+# Candidate Search (stored analyses)
+# ------------------------------
+with st.expander("🔎 **Candidate Search** - query past analyses by skill"):
+    search_col1, search_col2 = st.columns([1, 1])
+    with search_col1:
+        has_skills = st.text_input("Has skills (comma-separated)", placeholder="Kubernetes, Go")
+    with search_col2:
+        missing_skills = st.text_input("Missing skills (comma-separated)", placeholder="Terraform")
+    only_missing = st.checkbox("Missing only these skills")
+    if has_skills or missing_skills:
+        candidates = get_corpus_store().find_candidates(
+            has=split_list(has_skills),
+            missing=split_list(missing_skills),
+            only_missing=only_missing,
+        )
+        if candidates:
+            st.dataframe(candidates, use_container_width=True, hide_index=True)
+        else:
+            st.info("No stored analyses match this query.")
+
+with performance_panel.container():
+    render_performance_panel(selected_model)
 
 # ------------------------------
 # Footer
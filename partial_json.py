@@ -0,0 +1,122 @@
+# partial_json.py
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalObjectParser:
+    """Incrementally parse a streamed top-level JSON object.
+
+    `feed(chunk)` returns the (key, value) pairs whose values completed in that
+    chunk, so callers can render each field as soon as it is fully generated.
+    Leading `<think>...</think>` blocks and code fences are skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self._pos = None  # index just after the last consumed field, once "{" is found
+        self.complete = False
+
+    def _find_start(self):
+        search_from = 0
+        if "<think>" in self.buffer:
+            end = self.buffer.rfind("</think>")
+            if end == -1:
+                return None
+            search_from = end + len("</think>")
+        start = self.buffer.find("{", search_from)
+        return None if start == -1 else start + 1
+
+    def feed(self, chunk) -> list:
+        self.buffer += chunk
+        if self.complete:
+            return []
+        if self._pos is None:
+            self._pos = self._find_start()
+            if self._pos is None:
+                return []
+        completed = []
+        while True:
+            field = self._next_field()
+            if field is None:
+                break
+            key, value, self._pos = field
+            self.fields[key] = value
+            completed.append((key, value))
+        return completed
+
+    def _skip(self, pos, chars=_WHITESPACE):
+        while pos < len(self.buffer) and self.buffer[pos] in chars:
+            pos += 1
+        return pos
+
+    def _next_field(self):
+        """Parse `"key": value` at the current position, or None if not yet complete"""
+        buf = self.buffer
+        pos = self._skip(self._pos, _WHITESPACE + ",")
+        if pos >= len(buf):
+            return None
+        if buf[pos] == "}":
+            self.complete = True
+            return None
+        key_end = self._scan_string(pos)
+        if key_end is None:
+            return None
+        key = json.loads(buf[pos:key_end])
+        pos = self._skip(key_end)
+        if pos >= len(buf):
+            return None
+        if buf[pos] != ":":
+            raise ValueError(f"expected ':' after key {key!r}")
+        value_start = self._skip(pos + 1)
+        value_end = self._scan_value(value_start)
+        if value_end is None:
+            return None
+        return key, json.loads(buf[value_start:value_end]), value_end
+
+    def _scan_string(self, pos):
+        """Index after the closing quote of the string starting at `pos`"""
+        buf = self.buffer
+        if pos >= len(buf) or buf[pos] != '"':
+            return None
+        i = pos + 1
+        while i < len(buf):
+            if buf[i] == "\\":
+                i += 2
+                continue
+            if buf[i] == '"':
+                return i + 1
+            i += 1
+        return None
+
+    def _scan_value(self, pos):
+        """Index after the JSON value starting at `pos`, once it is known to be complete"""
+        buf = self.buffer
+        if pos >= len(buf):
+            return None
+        char = buf[pos]
+        if char == '"':
+            return self._scan_string(pos)
+        if char in "[{":
+            depth = 0
+            i = pos
+            while i < len(buf):
+                if buf[i] == '"':
+                    i = self._scan_string(i)
+                    if i is None:
+                        return None
+                    continue
+                if buf[i] in "[{":
+                    depth += 1
+                elif buf[i] in "]}":
+                    depth -= 1
+                    if depth == 0:
+                        return i + 1
+                i += 1
+            return None
+        # Scalars (numbers, true/false/null) are only complete once a delimiter follows
+        i = pos
+        while i < len(buf) and buf[i] not in ",}" + _WHITESPACE:
+            i += 1
+        return i if i < len(buf) else None
@@ -0,0 +1,142 @@
+# pdf_extract.py
+import io
+import os
+import atexit
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf import PdfReader
+
+from metrics import get_metrics
+
+# ------------------------------
+# Config
+# ------------------------------
+MEMORY_CACHE_SIZE = int(os.environ.get("PDF_TEXT_CACHE_SIZE", 64))
+DISK_CACHE_DIR = os.environ.get("PDF_TEXT_CACHE_DIR", "")  # empty disables the disk cache
+# Every worker re-parses the whole file and the bytes are pickled to it, so the pool only pays off
+# on long documents; resumes and JDs (1-5 pages) are always extracted inline
+PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 32))
+MAX_WORKERS = int(os.environ.get("PDF_MAX_WORKERS", min(4, os.cpu_count() or 1)))
+
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# ------------------------------
+# Page extraction
+# ------------------------------
+def _extract_page_range(data: bytes, start: int, stop: int) -> list:
+    """Extract text for pages [start, stop) - runs inside a worker process"""
+    reader = PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Streamlit serves sessions from threads, so avoid plain fork()
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context(method))
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _page_chunks(page_count: int, workers: int):
+    chunk = -(-page_count // workers)
+    return [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+
+
+def _extract(data: bytes) -> str:
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    if page_count < PARALLEL_MIN_PAGES or MAX_WORKERS < 2:
+        pages = [page.extract_text() or "" for page in reader.pages]
+    else:
+        pool = _get_pool()
+        futures = [
+            pool.submit(_extract_page_range, data, start, stop)
+            for start, stop in _page_chunks(page_count, MAX_WORKERS)
+        ]
+        pages = [text for future in futures for text in future.result()]
+    return "\n".join(text for text in pages if text)
+
+
+# ------------------------------
+# Caches
+# ------------------------------
+def _disk_path(digest: str) -> str:
+    return os.path.join(DISK_CACHE_DIR, f"{digest}.txt")
+
+
+def _read_disk(digest: str):
+    if not DISK_CACHE_DIR:
+        return None
+    try:
+        with open(_disk_path(digest), encoding="utf-8") as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+
+def _write_disk(digest: str, text: str):
+    if not DISK_CACHE_DIR:
+        return
+    fh = None
+    try:
+        os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+        # A unique temp name, so concurrent writers of the same digest never interleave
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=DISK_CACHE_DIR, suffix=".tmp",
+                                         delete=False) as fh:
+            fh.write(text)
+        os.replace(fh.name, _disk_path(digest))
+    except OSError:
+        # Read-only or full volume: the text was extracted fine, it just isn't cached on disk
+        if fh is not None:
+            try:
+                os.remove(fh.name)
+            except OSError:
+                pass
+
+
+def _remember(digest: str, text: str):
+    with _memory_lock:
+        _memory_cache[digest] = text
+        _memory_cache.move_to_end(digest)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def extract_pdf_text(data: bytes) -> str:
+    """Extract text from PDF bytes, memoized on the SHA-256 of the file contents"""
+    with get_metrics().span("pdf_extract", bytes=len(data)) as span:
+        digest = file_digest(data)
+        with _memory_lock:
+            if digest in _memory_cache:
+                _memory_cache.move_to_end(digest)
+                span["cache"] = "memory"
+                return _memory_cache[digest]
+
+        text = _read_disk(digest)
+        span["cache"] = "disk" if text is not None else "miss"
+        if text is None:
+            text = _extract(data)
+            _write_disk(digest, text)
+        _remember(digest, text)
+        return text
+
+
+def clear_memory_cache():
+    with _memory_lock:
+        _memory_cache.clear()
@@ -0,0 +1,109 @@
+# prerank.py
+import re
+from collections import Counter
+
+import numpy as np
+
+from skill_matcher import get_skill_index
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9+#.]*[a-z0-9+#]|[a-z]")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the their this to we will with "
+    "you your years year experience work working team role ability strong skills knowledge".split()
+)
+SKILL_TOKEN_WEIGHT = 3  # canonical skill hits count as this many term occurrences
+
+
+def tokenize(text) -> list:
+    """Lower-cased word tokens plus weighted `skill:<name>` tokens for canonical skills"""
+    words = [word for word in _WORD_RE.findall((text or "").lower()) if word not in STOPWORDS]
+    skills = [f"skill:{skill.lower()}" for skill in get_skill_index().extract(text or "")]
+    return words + skills * SKILL_TOKEN_WEIGHT
+
+
+class ResumeRanker:
+    """CPU-only BM25 pre-ranker.
+
+    Resumes are stored as a CSR matrix (n_resumes x vocab) of BM25 term weights in
+    plain NumPy arrays; a block of JDs is scored against every resume at once with a
+    vectorized sparse-dense product (gather + segmented sum over the CSR rows).
+    """
+
+    JD_BLOCK = 8  # JDs scored per vectorized block, bounds the (block x nnz) temporary
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.vocabulary = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.data = np.zeros(0, dtype=np.float32)
+
+    def fit(self, resumes):
+        """Index resumes given as {id: text} or [(id, text), ...]"""
+        items = list(resumes.items()) if isinstance(resumes, dict) else list(resumes)
+        self.ids = [resume_id for resume_id, _ in items]
+        indptr, cols, counts = [0], [], []
+        for _, text in items:
+            term_counts = Counter(tokenize(text))
+            for term, count in term_counts.items():
+                cols.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                counts.append(count)
+            indptr.append(len(cols))
+
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(cols, dtype=np.int64)
+        tf = np.array(counts, dtype=np.float64)
+        n_docs = len(items)
+        doc_freq = np.bincount(self.indices, minlength=len(self.vocabulary))
+        idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        cumulative_tf = np.concatenate(([0.0], np.cumsum(tf)))
+        row_lengths = cumulative_tf[self.indptr[1:]] - cumulative_tf[self.indptr[:-1]]
+        avg_length = row_lengths.mean() if n_docs else 0.0
+        norm = self.k1 * (1 - self.b + self.b * row_lengths / (avg_length or 1.0))
+        row_norm = np.repeat(norm, np.diff(self.indptr))
+        self.data = (tf * (self.k1 + 1) / (tf + row_norm) * idf[self.indices]).astype(np.float32)
+        return self
+
+    def _query_matrix(self, jd_texts) -> np.ndarray:
+        """Dense (n_jds x vocab) binary query matrix over the resume vocabulary"""
+        queries = np.zeros((len(jd_texts), len(self.vocabulary)), dtype=np.float32)
+        for row, text in enumerate(jd_texts):
+            cols = [self.vocabulary[term] for term in set(tokenize(text)) if term in self.vocabulary]
+            queries[row, cols] = 1.0
+        return queries
+
+    def score(self, jd_texts) -> np.ndarray:
+        """(n_jds x n_resumes) BM25 scores"""
+        scores = np.zeros((len(jd_texts), len(self.ids)), dtype=np.float32)
+        for start in range(0, len(jd_texts), self.JD_BLOCK):
+            queries = self._query_matrix(jd_texts[start:start + self.JD_BLOCK])
+            contributions = queries[:, self.indices] * self.data
+            # Segmented row sums via a cumulative sum: exact even for empty rows
+            cumulative = np.zeros((len(queries), len(self.data) + 1), dtype=np.float64)
+            np.cumsum(contributions, axis=1, out=cumulative[:, 1:])
+            scores[start:start + len(queries)] = cumulative[:, self.indptr[1:]] - cumulative[:, self.indptr[:-1]]
+        return scores
+
+    def top_k(self, jd_text, k) -> list:
+        """[(resume_id, score), ...] for the `k` best resumes, highest first"""
+        return _top_k(self.score([jd_text])[0], self.ids, k)
+
+
+def _top_k(scores, ids, k) -> list:
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best], kind="stable")]
+    return [(ids[i], float(scores[i])) for i in best]
+
+
+def shortlist(resumes, jds, k) -> dict:
+    """{jd_id: [(resume_id, score), ...]} - the top `k` resumes for every JD"""
+    ranker = ResumeRanker().fit(resumes)
+    jd_items = list(jds.items()) if isinstance(jds, dict) else list(jds)
+    scores = ranker.score([text for _, text in jd_items])
+    return {jd_id: _top_k(scores[row], ranker.ids, k) for row, (jd_id, _) in enumerate(jd_items)}
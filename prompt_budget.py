@@ -0,0 +1,155 @@
+# prompt_budget.py
+import re
+import unicodedata
+
+# ------------------------------
+# Budgets
+# ------------------------------
+# Tokens available for the resume + JD text per model. Sized to leave room for the
+# instructions and the completion inside each model's Groq tokens-per-minute limit.
+PROMPT_TOKEN_BUDGETS = {
+    "llama-3.1-8b-instant": 2500,
+    "qwen/qwen3-32b": 3000,
+    "llama-3.3-70b-versatile": 6000,
+    "openai/gpt-oss-120b": 4500,
+}
+DEFAULT_TOKEN_BUDGET = 3000
+JD_BUDGET_SHARE = 0.4
+
+# Section name -> heading keywords. Order in *_PRIORITY decides what survives truncation.
+SECTION_HEADINGS = {
+    "skills": ["skills", "technical skills", "core competencies", "technologies", "tech stack", "tools"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "work history"],
+    "education": ["education", "academic background", "qualifications", "degree"],
+    "projects": ["projects", "key projects", "personal projects"],
+    "certifications": ["certifications", "certificates", "licenses", "awards", "achievements"],
+    "summary": ["summary", "profile", "professional summary", "objective", "about me"],
+    "requirements": ["requirements", "required skills", "qualifications required", "must have", "what you'll need",
+                     "what you need", "who you are", "minimum qualifications", "basic qualifications"],
+    "nice_to_have": ["nice to have", "preferred qualifications", "preferred", "bonus", "pluses", "good to have"],
+    "responsibilities": ["responsibilities", "what you'll do", "what you will do", "the role", "role", "duties"],
+    "company": ["about us", "about the company", "who we are", "our mission", "company"],
+    "benefits": ["benefits", "perks", "what we offer", "compensation", "why join us"],
+    "boilerplate": ["equal opportunity", "eeo statement", "diversity", "how to apply", "privacy notice"],
+}
+RESUME_PRIORITY = ["skills", "experience", "education", "projects", "certifications", "summary", "other"]
+JD_PRIORITY = ["requirements", "skills", "nice_to_have", "responsibilities", "education", "experience", "other", "company"]
+DROPPED_SECTIONS = {"benefits", "boilerplate"}
+
+_HEADING_LOOKUP = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_BOILERPLATE_RE = re.compile(
+    r"(equal opportunity employer|without regard to (race|religion)|reasonable accommodation|"
+    r"references available upon request|curriculum vitae|page \d+ of \d+)",
+    re.IGNORECASE,
+)
+
+
+# ------------------------------
+# Token counting
+# ------------------------------
+def count_tokens(text) -> int:
+    """Local BPE-like token estimate: words split into ~6-letter pieces, numbers into 3-digit groups"""
+    total = 0
+    for piece in _TOKEN_RE.findall(text or ""):
+        total += 1 + (len(piece) - 1) // 6 if piece.isalpha() else 1 + (len(piece) - 1) // 3
+    return total
+
+
+# ------------------------------
+# Cleaning / segmentation
+# ------------------------------
+def clean_text(text) -> str:
+    """Collapse duplicate whitespace, drop boilerplate and repeated lines.
+
+    Also NFC-normalizes, so the same document always yields byte-identical prompt text.
+    """
+    seen = set()
+    lines = []
+    for line in unicodedata.normalize("NFC", text or "").splitlines():
+        line = " ".join(line.split())
+        key = line.lower()
+        if not line or _BOILERPLATE_RE.search(line) or (key in seen and len(key) > 3):
+            continue
+        seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _heading_section(line):
+    """Return the section name if `line` looks like a heading, else None"""
+    candidate = line.strip().strip(":#*-•|").strip().lower()
+    if not candidate or len(candidate) > 40:
+        return None
+    return _HEADING_LOOKUP.get(candidate)
+
+
+def segment(text) -> dict:
+    """Split cleaned text into {section: text}, keeping unheaded lines under "other" """
+    sections = {}
+    current = "other"
+    for line in clean_text(text).splitlines():
+        section = _heading_section(line)
+        if section:
+            current = section
+            continue
+        sections.setdefault(current, []).append(line)
+    return {name: "\n".join(lines) for name, lines in sections.items()}
+
+
+# ------------------------------
+# Packing
+# ------------------------------
+def _truncate(text, budget) -> str:
+    """Keep whole lines while they fit in `budget` tokens"""
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def pack_sections(text, budget, priority) -> tuple:
+    """Pack the highest-priority sections into `budget` tokens; returns (text, tokens used)"""
+    sections = segment(text)
+    parts, used = [], 0
+    for name in priority + [name for name in sections if name not in priority]:
+        if name not in sections or name in DROPPED_SECTIONS:
+            continue
+        body = sections[name]
+        header = "" if name == "other" else f"{name.replace('_', ' ').upper()}:\n"
+        remaining = budget - used - count_tokens(header)
+        if remaining <= 0:
+            break
+        if count_tokens(body) > remaining:
+            body = _truncate(body, remaining)
+            if not body:
+                continue
+        parts.append(header + body)
+        used += count_tokens(header + body)
+    return "\n\n".join(parts), used
+
+
+def prepare_inputs(job_description, resume_text, model, packed_jd=None) -> dict:
+    """Clean, segment and pack the JD and resume into the model's prompt token budget.
+
+    `packed_jd` is already-compact JD text (e.g. a JD profile), used as-is
+    instead of packing the raw JD.
+    """
+    budget = PROMPT_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+    if packed_jd is None:
+        jd_text, jd_tokens = pack_sections(job_description, int(budget * JD_BUDGET_SHARE), JD_PRIORITY)
+    else:
+        jd_text, jd_tokens = packed_jd, count_tokens(packed_jd)
+    # Whatever the JD didn't use rolls over to the resume
+    resume_packed, resume_tokens = pack_sections(resume_text, budget - jd_tokens, RESUME_PRIORITY)
+    return {
+        "job_description": jd_text,
+        "resume_text": resume_packed,
+        "input_tokens": jd_tokens + resume_tokens,
+        "original_tokens": count_tokens(job_description) + count_tokens(resume_text),
+        "budget": budget,
+    }
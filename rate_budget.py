@@ -0,0 +1,159 @@
+# rate_budget.py
+import os
+import time
+import sqlite3
+import threading
+
+DEFAULT_BUDGET_PATH = os.path.join(".cache", "rate_limits.sqlite3")
+IDLE_EXPIRY_SECONDS = 120  # an untouched Redis bucket expires (i.e. refills) after this
+
+
+class SharedTokenBucket:
+    """Token bucket whose state lives outside the process, shared by every replica.
+
+    Same `reserve` / `headroom` / `drain` contract as llm_client.TokenBucket.
+    Subclasses store (tokens, updated) and provide an atomic `_take` plus a
+    read-only `_peek`. Uses wall-clock time since it is compared across processes.
+    """
+
+    def __init__(self, name, per_minute):
+        self.name = name
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+
+    def _refilled(self, tokens, updated, now) -> float:
+        return min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+    def _take(self, amount, floor=None) -> float:
+        """Refill, subtract `amount` (and clamp to `floor`), return the remaining tokens"""
+        raise NotImplementedError
+
+    def _peek(self) -> float:
+        """The refilled token count, without writing anything"""
+        raise NotImplementedError
+
+    def reserve(self, amount) -> float:
+        tokens = self._take(min(float(amount), self.capacity))
+        return 0.0 if tokens >= 0 else -tokens / self.rate
+
+    def headroom(self) -> float:
+        return max(0.0, self._peek()) / self.capacity
+
+    def drain(self, seconds):
+        """Put the bucket `seconds` in debt for everyone (e.g. after a 429 with retry-after)"""
+        self._take(0.0, floor=-seconds * self.rate)
+
+    def wait_time(self, amount) -> float:
+        return max(0.0, min(float(amount), self.capacity) - self._peek()) / self.rate
+
+
+class SqliteTokenBucket(SharedTokenBucket):
+    """The shared bucket in a SQLite file every process / replica mounts.
+
+    Each `_take` is one short IMMEDIATE transaction; `_peek` is a plain SELECT,
+    so polling headroom never contends for the write lock.
+    """
+
+    SCHEMA = "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+
+    def __init__(self, path, name, per_minute):
+        super().__init__(name, per_minute)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(self.SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _take(self, amount, floor=None) -> float:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            tokens, updated = row if row else (self.capacity, now)
+            tokens = self._refilled(tokens, updated, now) - amount
+            if floor is not None:
+                tokens = min(tokens, floor)
+            conn.execute("INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                         (self.name, tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return tokens
+
+    def _peek(self) -> float:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+        finally:
+            conn.close()
+        return self._refilled(*row, time.time()) if row else self.capacity
+
+
+# Refill + take in one atomic step; returns the remaining tokens as a string
+_REDIS_TAKE = """
+local capacity, rate, now, amount = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate) - amount
+if ARGV[5] ~= '' then tokens = math.min(tokens, tonumber(ARGV[5])) end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return tostring(tokens)
+"""
+
+
+class RedisTokenBucket(SharedTokenBucket):
+    """The shared bucket on any Redis-compatible server (Redis, Valkey, KeyDB, ...)"""
+
+    def __init__(self, redis_client, name, per_minute, prefix="resume_matcher:bucket:"):
+        super().__init__(name, per_minute)
+        self.key = prefix + name
+        self._redis = redis_client
+        self._script = redis_client.register_script(_REDIS_TAKE)
+
+    def _take(self, amount, floor=None) -> float:
+        return float(self._script(keys=[self.key], args=[
+            self.capacity, self.rate, time.time(), amount, "" if floor is None else floor, IDLE_EXPIRY_SECONDS,
+        ]))
+
+    def _peek(self) -> float:
+        tokens, updated = self._redis.hmget(self.key, "tokens", "updated")
+        if tokens is None or updated is None:
+            return self.capacity  # never used, or expired after IDLE_EXPIRY_SECONDS, i.e. full
+        return self._refilled(float(tokens), float(updated), time.time())
+
+
+_redis_clients = {}
+_redis_lock = threading.Lock()
+
+
+def _redis_client(url):
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError("RATE_LIMIT_BACKEND is a redis:// URL but the `redis` package is not installed")
+    with _redis_lock:
+        if url not in _redis_clients:
+            _redis_clients[url] = redis.Redis.from_url(url)
+        return _redis_clients[url]
+
+
+def shared_bucket(backend, name, per_minute):
+    """Bucket for a RATE_LIMIT_BACKEND value: "sqlite" (default file), sqlite:///relative/path,
+    sqlite:////absolute/path, a plain file path, or redis://host:6379/0"""
+    if backend.startswith(("redis://", "rediss://", "unix://")):
+        return RedisTokenBucket(_redis_client(backend), name, per_minute)
+    if backend.startswith("sqlite:///"):
+        backend = backend[len("sqlite:///"):]
+    if backend in ("sqlite", ""):
+        backend = DEFAULT_BUDGET_PATH
+    return SqliteTokenBucket(backend, name, per_minute)
@@ -0,0 +1,128 @@
+# result_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# ------------------------------
+# Config
+# ------------------------------
+DEFAULT_CACHE_PATH = os.environ.get("ANALYSIS_CACHE_PATH", os.path.join(".cache", "analysis_cache.sqlite3"))
+DEFAULT_TTL_SECONDS = int(os.environ.get("ANALYSIS_CACHE_TTL", 7 * 24 * 3600))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("ANALYSIS_CACHE_MAX_ENTRIES", 5000))
+
+
+# ------------------------------
+# Key building
+# ------------------------------
+def normalize_text(text) -> str:
+    """Normalize free text so cosmetic whitespace edits hit the same cache entry"""
+    if not text:
+        return ""
+    lines = (" ".join(line.split()) for line in str(text).strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def make_cache_key(job_description, resume_text, model, temperature, depth, prompt_fingerprint="") -> str:
+    """Content-addressed key over the normalized inputs plus the model config"""
+    payload = json.dumps(
+        {
+            "job_description": normalize_text(job_description),
+            "resume_text": normalize_text(resume_text),
+            "model": model,
+            "temperature": round(float(temperature), 3),
+            "depth": depth,
+            "prompt": prompt_fingerprint,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ------------------------------
+# SQLite backend
+# ------------------------------
+class AnalysisCache:
+    """SQLite-backed result cache with TTL expiry, LRU eviction and hit/miss counters"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0), ('evictions', 0)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _bump(self, conn, name, amount=1):
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, key):
+        """Return the cached result dict, or None on a miss or an expired entry"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._bump(conn, "evictions")
+                row = None
+            if row is None:
+                self._bump(conn, "misses")
+                return None
+            conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            self._bump(conn, "hits")
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Store a parsed result and evict the least recently used entries over the size bound"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if self.ttl_seconds:
+                expired = conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+                if expired:
+                    self._bump(conn, "evictions", expired)
+            overflow = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self._bump(conn, "evictions", overflow)
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters plus the current entry count"""
+        with self._connect() as conn:
+            stats = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            stats["entries"] = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM results")
+            conn.execute("UPDATE counters SET value = 0")
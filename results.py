@@ -0,0 +1,216 @@
+# results.py
+"""Compact typed analysis records and columnar export for large batches.
+
+Each ResumeAnalysisResult dict is parsed once into an AnalysisRecord: list
+fields become tuples of interned strings, so the thousands of "Python"s in a
+batch share one object and nothing downstream re-splits comma strings.
+Records export to CSV (or Parquet when pyarrow is installed) plus a
+pair x skill matrix for analytics tools.
+
+    records = [AnalysisRecord.from_batch(record) for record in match_batch(resumes, jds)]
+    export(records, "exports/", fmt="parquet")
+"""
+import os
+import re
+import csv
+import sys
+from dataclasses import dataclass, fields
+from functools import lru_cache
+
+from json_repair import coerce_fields
+from skill_matcher import SKILL_ALIASES, get_skill_index
+
+# ------------------------------
+# Config
+# ------------------------------
+LIST_SEPARATOR = "; "  # joins list fields inside one CSV cell
+EXPORT_FORMATS = ("csv", "parquet")
+# Skill matrix cell values; 0 = skill not mentioned for that pair
+SKILL_STATUS = {"matched": 1, "missing": -1, "extra": 2}
+
+_LIST_NOISE_RE = re.compile(r'[\[\]"]')
+
+
+# ------------------------------
+# Parsing
+# ------------------------------
+def split_list(value) -> list:
+    """A comma-separated LLM field (or a stray JSON array) as clean items.
+
+    1-char items are parse noise, except canonical skills such as "C" and "R".
+    """
+    if not value:
+        return []
+    items = value if isinstance(value, (list, tuple)) else _LIST_NOISE_RE.sub("", str(value)).split(",")
+    return [item for item in (str(item).strip() for item in items) if len(item) > 1 or item in SKILL_ALIASES]
+
+
+@lru_cache(maxsize=8192)
+def normalize_skill(skill) -> str:
+    """Map a skill string to its canonical key ("k8s" -> "kubernetes"), else lower-case it"""
+    skill = " ".join(str(skill).split())
+    canonical = get_skill_index().extract(skill)
+    return (canonical[0] if len(canonical) == 1 else skill).lower()
+
+
+def _interned(value) -> tuple:
+    return tuple(sys.intern(item) for item in split_list(value))
+
+
+@dataclass(slots=True)
+class AnalysisRecord:
+    """One resume/JD analysis, parsed once; list fields are tuples of interned strings"""
+    jd_id: str = ""
+    resume_id: str = ""
+    model: str = ""
+    depth: str = ""
+    overall_match_percentage: int = 0
+    selection_probability: str = ""
+    skills_matched: tuple = ()
+    skills_missing: tuple = ()
+    skills_extra: tuple = ()
+    experience_match: str = ""
+    education_match: str = ""
+    strength_areas: tuple = ()
+    improvement_areas: tuple = ()
+    specific_recommendations: tuple = ()
+    interview_preparation: tuple = ()
+    salary_competitiveness: str = ""
+    cached: bool = False
+    elapsed: float = 0.0
+    prerank_score: float | None = None
+    error: str = ""
+
+    @classmethod
+    def from_result(cls, result, **meta) -> "AnalysisRecord":
+        """Parse a ResumeAnalysisResult dict; `meta` fills the pair / run columns"""
+        values = {name: _interned(result.get(name)) for name in LIST_FIELDS}
+        values.update({name: str(result.get(name) or "") for name in TEXT_FIELDS})
+        # Same coercion as the engine's, so "72%" or "72.4" read as 72
+        values["overall_match_percentage"] = coerce_fields(
+            {"overall_match_percentage": result.get("overall_match_percentage")}, {"overall_match_percentage": int}
+        ).get("overall_match_percentage", 0)
+        # Short, heavily repeated labels are interned too
+        values["selection_probability"] = sys.intern(values["selection_probability"])
+        for name in ("jd_id", "resume_id", "model", "depth"):
+            if name in meta:
+                meta[name] = sys.intern(str(meta[name] or ""))
+        return cls(**values, **meta)
+
+    @classmethod
+    def from_batch(cls, record) -> "AnalysisRecord":
+        """From an `engine.amatch_batch` record; failed pairs keep only their error"""
+        return cls.from_result(
+            record.get("result") or {},
+            jd_id=record["jd_id"],
+            resume_id=record["resume_id"],
+            model=record.get("model", ""),
+            depth=record.get("depth", ""),
+            cached=bool(record.get("cached")),
+            elapsed=record.get("elapsed", 0.0),
+            prerank_score=record.get("prerank_score"),
+            error=record.get("error", ""),
+        )
+
+    def skills(self, kind) -> tuple:
+        return getattr(self, f"skills_{kind}")
+
+    def row(self) -> list:
+        """CSV cells in COLUMNS order, list fields joined with LIST_SEPARATOR"""
+        row = []
+        for name in COLUMNS:
+            value = getattr(self, name)
+            row.append(LIST_SEPARATOR.join(value) if name in LIST_FIELDS else value)
+        return row
+
+
+COLUMNS = [f.name for f in fields(AnalysisRecord)]
+LIST_FIELDS = {f.name for f in fields(AnalysisRecord) if f.type is tuple}
+TEXT_FIELDS = ["experience_match", "education_match", "selection_probability", "salary_competitiveness"]
+
+
+# ------------------------------
+# Skill matrix
+# ------------------------------
+def skill_columns(records) -> list:
+    """Every normalized skill any record matched, missed or listed as extra, sorted"""
+    return sorted({normalize_skill(skill) for record in records for kind in SKILL_STATUS
+                   for skill in record.skills(kind)})
+
+
+def skill_matrix_rows(records, columns):
+    """(jd_id, resume_id, *status per skill column) for each successful record"""
+    position = {skill: i for i, skill in enumerate(columns)}
+    for record in records:
+        if record.error:
+            continue
+        cells = [0] * len(columns)
+        # Later kinds win, so a skill the model listed as both matched and missing counts as matched
+        for kind in ("extra", "missing", "matched"):
+            for skill in record.skills(kind):
+                cells[position[normalize_skill(skill)]] = SKILL_STATUS[kind]
+        yield [record.jd_id, record.resume_id, *cells]
+
+
+# ------------------------------
+# Export
+# ------------------------------
+def write_csv(records, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(record.row() for record in records)
+
+
+def write_skill_matrix_csv(records, path):
+    columns = skill_columns(records)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["jd_id", "resume_id", *columns])
+        writer.writerows(skill_matrix_rows(records, columns))
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet export needs the `pyarrow` package (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+
+def write_parquet(records, path):
+    """Results as Parquet; list fields stay list<string> columns (dictionary-encoded on disk)"""
+    pa, pq = _pyarrow()
+    # Explicit types, so a column that is empty or all-null in this batch keeps its schema
+    types = {str: pa.string(), int: pa.int32(), bool: pa.bool_(), tuple: pa.list_(pa.string())}
+    arrays = {f.name: pa.array([getattr(record, f.name) for record in records], types.get(f.type, pa.float64()))
+              for f in fields(AnalysisRecord)}
+    pq.write_table(pa.table(arrays), path)
+
+
+def write_skill_matrix_parquet(records, path):
+    pa, pq = _pyarrow()
+    columns = skill_columns(records)
+    rows = list(skill_matrix_rows(records, columns))
+    arrays = {"jd_id": pa.array([row[0] for row in rows], pa.string()),
+              "resume_id": pa.array([row[1] for row in rows], pa.string())}
+    for i, skill in enumerate(columns, 2):
+        arrays[skill] = pa.array([row[i] for row in rows], pa.int8())
+    pq.write_table(pa.table(arrays), path)
+
+
+def export(records, out_dir, fmt="csv") -> list:
+    """Write results.<fmt> and skill_matrix.<fmt> into `out_dir`; returns the paths written"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"fmt must be one of {EXPORT_FORMATS}")
+    os.makedirs(out_dir, exist_ok=True)
+    results_path = os.path.join(out_dir, f"results.{fmt}")
+    matrix_path = os.path.join(out_dir, f"skill_matrix.{fmt}")
+    if fmt == "parquet":
+        write_parquet(records, results_path)
+        write_skill_matrix_parquet(records, matrix_path)
+    else:
+        write_csv(records, results_path)
+        write_skill_matrix_csv(records, matrix_path)
+    return [results_path, matrix_path]
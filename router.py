@@ -0,0 +1,114 @@
+# router.py
+import os
+import time
+import threading
+
+from metrics import get_metrics, percentile
+from prompt_budget import DEFAULT_TOKEN_BUDGET, PROMPT_TOKEN_BUDGETS
+
+# ------------------------------
+# Config
+# ------------------------------
+# Pseudo model name: pick a real model per request instead of one global choice
+AUTO_MODEL = "Auto"
+
+# Relative capability of each entry in MODEL_OPTIONS, and the lowest tier each depth should get.
+# A lower tier is only used as the fallback when every capable model is throttled.
+MODEL_TIERS = {
+    "llama-3.1-8b-instant": 1,
+    "qwen/qwen3-32b": 2,
+    "llama-3.3-70b-versatile": 3,
+    "openai/gpt-oss-120b": 3,
+}
+DEPTH_TIERS = {"Quick": 1, "Standard": 1, "Deep": 2, "Comprehensive": 3}
+# Seconds per full analysis assumed until a model has its own latency history
+LATENCY_PRIORS = {
+    "llama-3.1-8b-instant": 1.5,
+    "qwen/qwen3-32b": 4.0,
+    "llama-3.3-70b-versatile": 3.0,
+    "openai/gpt-oss-120b": 3.5,
+}
+DEFAULT_LATENCY_PRIOR = 4.0
+# A model whose RPM/TPM buckets would make a request wait longer than this counts as throttled
+ROUTER_MAX_WAIT_SECONDS = float(os.environ.get("ROUTER_MAX_WAIT_SECONDS", 5))
+# Skip a model for a depth once this share of its responses needed repair (after MIN_SAMPLES)
+PARSE_FAILURE_LIMIT = float(os.environ.get("ROUTER_PARSE_FAILURE_LIMIT", 0.3))
+MIN_SAMPLES = 5
+FAILURE_DECAY = 0.9  # weight of the history in the parse-failure moving average
+
+
+class ModelRouter:
+    """Choose a model per request from depth, prompt size, rate-limit headroom and history.
+
+    Expected cost of a model = wait for its token buckets + its p95 request
+    latency, inflated by its parse-failure rate at that depth (a failure costs a
+    re-ask). The cheapest model at or above the depth's tier wins, preferring
+    models whose prompt budget fits the whole input; when all of those are
+    throttled the request falls back to the fastest model that isn't.
+    """
+
+    def __init__(self, client, tiers=MODEL_TIERS):
+        self.client = client
+        self.tiers = tiers
+        self._failures = {}  # (model, depth) -> [moving failure rate, samples]
+        self._lock = threading.Lock()
+
+    # ------------------------------
+    # History
+    # ------------------------------
+    def observe_parse(self, model, depth, failed):
+        """Record whether a response of `model` at `depth` needed repair"""
+        with self._lock:
+            rate, samples = self._failures.get((model, depth), (0.0, 0))
+            rate = float(failed) if not samples else rate * FAILURE_DECAY + float(failed) * (1 - FAILURE_DECAY)
+            self._failures[(model, depth)] = [rate, samples + 1]
+
+    def failure_rate(self, model, depth) -> float:
+        with self._lock:
+            rate, samples = self._failures.get((model, depth), (0.0, 0))
+        return rate if samples >= MIN_SAMPLES else 0.0
+
+    def latency(self, model) -> float:
+        samples = get_metrics().recent("llm_request", model)
+        if len(samples) < MIN_SAMPLES:
+            return LATENCY_PRIORS.get(model, DEFAULT_LATENCY_PRIOR)
+        return percentile(samples, 95)
+
+    # ------------------------------
+    # Routing
+    # ------------------------------
+    async def score(self, model, depth, input_tokens, fixed_tokens) -> dict:
+        budget = PROMPT_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+        wait = await self.client.limiter(model).wait_estimate(min(input_tokens, budget) + fixed_tokens)
+        failure_rate = self.failure_rate(model, depth)
+        return {
+            "model": model,
+            "tier": self.tiers[model],
+            "wait": wait,
+            "cost": wait + self.latency(model) * (1 + failure_rate),
+            "throttled": wait > ROUTER_MAX_WAIT_SECONDS,
+            "unreliable": failure_rate >= PARSE_FAILURE_LIMIT,
+            "fits": input_tokens <= budget,
+        }
+
+    async def aroute(self, depth, input_tokens, fixed_tokens=0, prefer=None) -> str:
+        """Model for one analysis of `input_tokens` document tokens (+ `fixed_tokens` of prompt and completion).
+
+        `prefer` (e.g. the model of the previous analysis) wins whenever it is a
+        capable, unthrottled choice, so incremental re-analysis can reuse results.
+        """
+        started = time.perf_counter()
+        scores = [await self.score(model, depth, input_tokens, fixed_tokens) for model in self.tiers]
+        tier = DEPTH_TIERS.get(depth, 1)
+        capable = [s for s in scores if s["tier"] >= tier and not s["unreliable"] and not s["throttled"]]
+        if capable:
+            reason = "capable"
+            preferred = [s for s in capable if s["model"] == prefer]
+            choice = preferred[0] if preferred else min(capable, key=lambda s: (not s["fits"], s["cost"]))
+        else:
+            open_models = [s for s in scores if not s["throttled"]]
+            reason = "fallback" if open_models else "least_wait"
+            choice = min(open_models or scores, key=lambda s: s["cost"])
+        get_metrics().observe("route", time.perf_counter() - started, choice["model"], depth=depth,
+                              reason=reason, input_tokens=input_tokens, wait=round(choice["wait"], 3))
+        return choice["model"]
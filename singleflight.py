@@ -0,0 +1,78 @@
+# singleflight.py
+import asyncio
+
+
+class LeaderAbandoned(Exception):
+    """The leader was cancelled / abandoned before finishing; a follower should take over"""
+
+
+class SingleFlight:
+    """Coalesce concurrent identical async calls onto one in-flight execution.
+
+    The first caller for a key becomes the leader and runs the work; callers
+    arriving while it is in flight await the leader's result instead of
+    starting their own. If the leader is cancelled (e.g. its client disconnected),
+    the key is released and one waiting follower re-runs the work as the new
+    leader. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def claim(self, key) -> tuple:
+        """Return (future, is_leader). A leader must later call `resolve` or `fail`; prefer `join`"""
+        future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+            return future, False
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.leaders += 1
+        return future, True
+
+    def resolve(self, key, result):
+        future = self._calls.pop(key)
+        if not future.done():
+            future.set_result(result)
+
+    def fail(self, key, exc):
+        future = self._calls.pop(key)
+        if future.done():
+            return
+        # A cancelled / abandoned leader says nothing about the followers' own requests:
+        # don't cancel them or hand them GeneratorExit, let `join` retry instead
+        future.set_exception(exc if isinstance(exc, Exception) else LeaderAbandoned(key))
+        future.exception()  # followers (if any) re-raise it; don't warn when there are none
+
+    async def join(self, key) -> tuple:
+        """(True, None) once the caller is the leader for `key`, else (False, the leader's result).
+
+        Followers of an abandoned leader claim again, so the first to wake up
+        leads the retry and the rest follow it.
+        """
+        while True:
+            future, leader = self.claim(key)
+            if leader:
+                return True, None
+            try:
+                return False, await asyncio.shield(future)
+            except LeaderAbandoned:
+                continue
+
+    async def do(self, key, fn):
+        """Run `fn()` once per key at a time; concurrent callers share its result"""
+        leader, result = await self.join(key)
+        if not leader:
+            return result
+        try:
+            result = await fn()
+        except BaseException as exc:
+            self.fail(key, exc)
+            raise
+        self.resolve(key, result)
+        return result
+
+    def in_flight(self) -> int:
+        return len(self._calls)
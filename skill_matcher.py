@@ -0,0 +1,262 @@
+# skill_matcher.py
+import re
+from collections import deque
+
+# ------------------------------
+# Skill dictionary
+# ------------------------------
+# Canonical skill name -> aliases. Matching is case-insensitive and on token
+# boundaries; aliases listed in CASE_SENSITIVE_ALIASES must match exactly.
+SKILL_ALIASES = {
+    # Languages
+    "Python": ["python", "python3"],
+    "JavaScript": ["javascript", "js", "ecmascript", "es6"],
+    "TypeScript": ["typescript", "ts"],
+    "Java": ["java"],
+    "Kotlin": ["kotlin"],
+    "Scala": ["scala"],
+    "Go": ["golang", "Go"],
+    "Rust": ["rust"],
+    "C": ["C"],
+    "C++": ["c++", "cpp"],
+    "C#": ["c#", "csharp", "c sharp"],
+    "Ruby": ["ruby"],
+    "PHP": ["php"],
+    "Swift": ["swift"],
+    "R": ["R"],
+    "MATLAB": ["matlab"],
+    "Bash": ["bash", "shell scripting", "shell script"],
+    "SQL": ["sql"],
+    "HTML": ["html", "html5"],
+    "CSS": ["css", "css3"],
+    # Frontend
+    "React": ["react", "react.js", "reactjs"],
+    "Angular": ["angular", "angularjs", "angular.js"],
+    "Vue.js": ["vue", "vue.js", "vuejs"],
+    "Next.js": ["next.js", "nextjs"],
+    "Redux": ["redux"],
+    "Tailwind CSS": ["tailwind", "tailwindcss", "tailwind css"],
+    # Backend
+    "Node.js": ["node.js", "nodejs"],
+    "Express": ["express.js", "expressjs"],
+    "Django": ["django"],
+    "Flask": ["flask"],
+    "FastAPI": ["fastapi"],
+    "Spring Boot": ["spring boot", "springboot", "spring framework"],
+    "Ruby on Rails": ["rails", "ruby on rails"],
+    ".NET": [".net", "dotnet", "asp.net"],
+    "GraphQL": ["graphql"],
+    "REST APIs": ["restful", "rest api", "rest apis", "restful apis"],
+    "gRPC": ["grpc"],
+    "Microservices": ["microservices", "microservice"],
+    # Data stores
+    "PostgreSQL": ["postgresql", "postgres"],
+    "MySQL": ["mysql"],
+    "SQLite": ["sqlite"],
+    "MongoDB": ["mongodb", "mongo"],
+    "Redis": ["redis"],
+    "Elasticsearch": ["elasticsearch", "elastic search"],
+    "Cassandra": ["cassandra"],
+    "DynamoDB": ["dynamodb"],
+    "Snowflake": ["snowflake"],
+    "BigQuery": ["bigquery"],
+    # Cloud / DevOps
+    "AWS": ["aws", "amazon web services"],
+    "Azure": ["azure", "microsoft azure"],
+    "GCP": ["gcp", "google cloud", "google cloud platform"],
+    "Docker": ["docker"],
+    "Kubernetes": ["kubernetes", "k8s"],
+    "Terraform": ["terraform"],
+    "Ansible": ["ansible"],
+    "Helm": ["helm"],
+    "Jenkins": ["jenkins"],
+    "GitHub Actions": ["github actions"],
+    "CI/CD": ["ci/cd", "cicd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "Linux": ["linux", "unix"],
+    "Git": ["git"],
+    "Prometheus": ["prometheus"],
+    "Grafana": ["grafana"],
+    "Kafka": ["kafka", "apache kafka"],
+    "RabbitMQ": ["rabbitmq"],
+    "Airflow": ["airflow", "apache airflow"],
+    "Spark": ["spark", "apache spark", "pyspark"],
+    "Hadoop": ["hadoop"],
+    # Data / ML
+    "Machine Learning": ["machine learning", "ml"],
+    "Deep Learning": ["deep learning"],
+    "NLP": ["nlp", "natural language processing"],
+    "Computer Vision": ["computer vision"],
+    "LLMs": ["llm", "llms", "large language models", "large language model"],
+    "LangChain": ["langchain"],
+    "TensorFlow": ["tensorflow"],
+    "PyTorch": ["pytorch", "torch"],
+    "scikit-learn": ["scikit-learn", "sklearn", "scikit learn"],
+    "Pandas": ["pandas"],
+    "NumPy": ["numpy"],
+    "Data Analysis": ["data analysis", "data analytics"],
+    "Data Visualization": ["data visualization", "data visualisation"],
+    "Tableau": ["tableau"],
+    "Power BI": ["power bi", "powerbi"],
+    "Excel": ["microsoft excel", "ms excel", "advanced excel"],
+    "Statistics": ["statistics", "statistical analysis"],
+    "ETL": ["etl", "elt"],
+    # Practices / tools
+    "Agile": ["agile", "scrum", "kanban"],
+    "Jira": ["jira"],
+    "Unit Testing": ["unit testing", "unit tests", "pytest", "junit", "jest"],
+    "TDD": ["tdd", "test-driven development", "test driven development"],
+    "System Design": ["system design", "distributed systems"],
+    "Data Structures": ["data structures", "algorithms", "data structures and algorithms"],
+    "OOP": ["oop", "object-oriented programming", "object oriented programming"],
+    "Security": ["security", "owasp", "application security"],
+    "Figma": ["figma"],
+    "UI/UX": ["ui/ux", "ux", "user experience", "ui design"],
+    # Soft skills
+    "Communication": ["communication", "communication skills"],
+    "Leadership": ["leadership", "team lead", "led a team"],
+    "Mentoring": ["mentoring", "mentorship", "coaching"],
+    "Problem Solving": ["problem solving", "problem-solving"],
+    "Teamwork": ["teamwork", "collaboration", "cross-functional"],
+    "Project Management": ["project management"],
+    "Stakeholder Management": ["stakeholder management"],
+}
+
+CASE_SENSITIVE_ALIASES = {"Go", "C", "R"}
+
+_TOKEN_CHARS = re.compile(r"[a-z0-9+#&]")
+
+
+def normalize(text) -> str:
+    """Lower-case and collapse whitespace; keeps +, #, ., / used in skill names"""
+    return " ".join(str(text).lower().split())
+
+
+# ------------------------------
+# Aho-Corasick automaton
+# ------------------------------
+class SkillIndex:
+    """Aho-Corasick automaton over normalized skill aliases.
+
+    `extract(text)` finds every canonical skill in one linear pass over the text.
+    """
+
+    def __init__(self, skill_aliases=SKILL_ALIASES):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for canonical, aliases in skill_aliases.items():
+            for alias in set(aliases):
+                exact = alias if alias in CASE_SENSITIVE_ALIASES else None
+                self._add(normalize(alias), canonical, exact)
+        self._build()
+
+    def _add(self, pattern, canonical, exact):
+        state = 0
+        for char in pattern:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].append((len(pattern), canonical, exact))
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def extract(self, text) -> list:
+        """Canonical skills found in `text`, in order of first appearance"""
+        original = " ".join(str(text).split())
+        lowered = original.lower()
+        found = {}
+        state = 0
+        for end, char in enumerate(lowered):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, canonical, exact in self.output[state]:
+                start = end - length + 1
+                if canonical in found or not self._on_boundary(lowered, start, end):
+                    continue
+                if exact and original[start:end + 1] != exact:
+                    continue
+                found[canonical] = start
+        return sorted(found, key=found.get)
+
+    @staticmethod
+    def _on_boundary(text, start, end) -> bool:
+        before = text[start - 1] if start > 0 else " "
+        after = text[end + 1] if end + 1 < len(text) else " "
+        # A trailing "." is sentence punctuation unless it starts a suffix like ".js"
+        if after == "." and (end + 2 >= len(text) or not text[end + 2].isalnum()):
+            after = " "
+        return not _TOKEN_CHARS.match(before) and not _TOKEN_CHARS.match(after) and before != "."
+
+
+_default_index = None
+
+
+def get_skill_index() -> SkillIndex:
+    global _default_index
+    if _default_index is None:
+        _default_index = SkillIndex()
+    return _default_index
+
+
+# ------------------------------
+# Matching
+# ------------------------------
+def match_skills(job_description, resume_text, index=None) -> dict:
+    """Matched / missing / extra canonical skill lists from a local lexical pass"""
+    index = index or get_skill_index()
+    jd_skills = index.extract(job_description)
+    resume_skills = index.extract(resume_text)
+    resume_set = set(resume_skills)
+    jd_set = set(jd_skills)
+    return {
+        "jd_skills": jd_skills,
+        "resume_skills": resume_skills,
+        "matched": [skill for skill in jd_skills if skill in resume_set],
+        "missing": [skill for skill in jd_skills if skill not in resume_set],
+        "extra": [skill for skill in resume_skills if skill not in jd_set],
+    }
+
+
+def selection_probability(percentage) -> str:
+    if percentage >= 75:
+        return "High"
+    elif percentage >= 50:
+        return "Medium"
+    return "Low"
+
+
+def local_analysis(job_description, resume_text, index=None) -> dict:
+    """Quick-depth ResumeAnalysisResult computed entirely locally (no LLM call)"""
+    skills = match_skills(job_description, resume_text, index)
+    matched, missing, extra = skills["matched"], skills["missing"], skills["extra"]
+    required = len(skills["jd_skills"])
+    percentage = round(100 * len(matched) / required) if required else 0
+
+    return {
+        "skills_matched": ", ".join(matched),
+        "skills_missing": ", ".join(missing),
+        "skills_extra": ", ".join(extra),
+        "experience_match": "Not assessed in Quick mode (local skill match only)",
+        "education_match": "Not assessed in Quick mode (local skill match only)",
+        "overall_match_percentage": percentage,
+        "selection_probability": selection_probability(percentage),
+        "strength_areas": ", ".join(matched[:3]),
+        "improvement_areas": ", ".join(missing[:3]),
+        "specific_recommendations": ", ".join(f"Add evidence of {skill} experience" for skill in missing[:5]),
+        "interview_preparation": ", ".join(f"Be ready to discuss {skill} projects" for skill in matched[:3]),
+        "salary_competitiveness": "Not assessed in Quick mode",
+    }